@@ -1,24 +1,69 @@
 """
 Document processing API endpoints with file upload support.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, ORJSONResponse
 from celery.result import AsyncResult
 from typing import List, Optional
+import uuid
 
 from app.schemas.document import (
     DocumentProcessRequest,
     DocumentProcessResponse,
     SearchRequest,
     SearchResponse,
-    ChunksListResponse
+    ChunksListResponse,
+    DocumentDeleteResponse,
+    ReindexRequest,
+    ReindexResponse
 )
 from app.schemas.task import TaskStatusResponse
-from app.tasks.document_tasks import process_pdf_task
-from app.core.celery_app import celery_app
-from app.services.vectordb_service import VectorDBService
+from app.core.celery_app import celery_app, pdf_queue_for, PROCESS_PDF_TASK, RECHUNK_TASK, REINDEX_TASK
+from app.core.dependencies import get_vectordb_service
+from app.services.image_store import image_url
+from app.services.reindex_service import read_reindex_state, start_reindex, write_reindex_state
+from app.utils.profiling import get_profile_path, profile_to, should_profile
 
 router = APIRouter()
-vectordb_service = VectorDBService()
+
+
+def _use_image_variant(results: List[dict], variant: str) -> List[dict]:
+    """Point image_references at the requested variant (chunks store thumbnail URLs)."""
+    if variant == "thumbnail":
+        return results
+    for result in results:
+        context = result.get("context") or {}
+        chunks = [result, context.get("previous"), context.get("next"), *context.get("linked", [])]
+        for chunk in filter(None, chunks):
+            hashes = chunk["metadata"].get("image_hashes")
+            if hashes:
+                chunk["metadata"]["image_references"] = ",".join(
+                    image_url(h, variant) for h in hashes.split(",")
+                )
+    return results
+
+
+def _project(chunk: dict, request: SearchRequest) -> dict:
+    """Keep only the fields of a result (or context chunk) the search asked for."""
+    projected = {"chunk_id": chunk["chunk_id"]}
+    if "distance" in chunk:
+        projected["distance"] = chunk["distance"]
+    if "document_text" in request.fields:
+        text = chunk["document_text"]
+        projected["document_text"] = text[:request.text_length] if text and request.text_length else text
+    if "metadata" in request.fields:
+        metadata = chunk["metadata"] or {}
+        if request.metadata_keys is not None:
+            metadata = {key: metadata[key] for key in request.metadata_keys if key in metadata}
+        projected["metadata"] = metadata
+    context = chunk.get("context")
+    if context:
+        projected["context"] = {
+            "previous": _project(context["previous"], request) if context["previous"] else None,
+            "next": _project(context["next"], request) if context["next"] else None,
+            "linked": [_project(linked, request) for linked in context["linked"]],
+        }
+    return projected
 
 
 @router.post("/process", response_model=DocumentProcessResponse)
@@ -30,13 +75,20 @@ async def process_document(request: DocumentProcessRequest):
     Returns a task_id that can be used to check the status.
     """
     try:
-        # Submit task to Celery
-        task = process_pdf_task.apply_async(
+        # Submit task to Celery by name; the API never imports worker code
+        task = celery_app.send_task(
+            PROCESS_PDF_TASK,
             args=[
                 request.pdf_path_or_url,
                 request.category,
                 request.subcategory
-            ]
+            ],
+            kwargs={
+                "profile": request.profile,
+                "conversion_profile": request.conversion_profile,
+                "tenant": request.tenant
+            },
+            queue=pdf_queue_for(request.priority)
         )
 
         return DocumentProcessResponse(
@@ -85,25 +137,38 @@ async def get_task_status(task_id: str):
 
 
 @router.post("/search", response_model=SearchResponse)
-async def search_documents(request: SearchRequest):
+async def search_documents(
+    request: SearchRequest,
+    vectordb_service=Depends(get_vectordb_service)
+):
     """
     Perform semantic search on processed documents.
+
+    Results carry only the requested fields and are serialized with orjson
+    directly; they come from the vector database, so they are not validated
+    again against the response model.
     """
     try:
-        results = vectordb_service.semantic_search(
-            query_text=request.query_text,
-            n_results=request.n_results,
-            category_filter=request.category_filter,
-            subcategory_filter=request.subcategory_filter,
-            images_only=request.images_only,
-            tables_only=request.tables_only
-        )
+        profile_id = uuid.uuid4().hex if should_profile(request.profile) else None
+        with profile_to(profile_id, enabled=profile_id is not None):
+            results = vectordb_service.semantic_search(
+                query_text=request.query_text,
+                n_results=request.n_results,
+                category_filter=request.category_filter,
+                subcategory_filter=request.subcategory_filter,
+                images_only=request.images_only,
+                tables_only=request.tables_only,
+                tenant_filter=request.tenant_filter,
+                expand=request.expand
+            )
+        results = _use_image_variant(results, request.image_variant)
 
-        return SearchResponse(
-            query=request.query_text,
-            results=results,
-            count=len(results)
-        )
+        return ORJSONResponse({
+            "query": request.query_text,
+            "results": [_project(result, request) for result in results],
+            "count": len(results),
+            "profile_id": profile_id
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -115,7 +180,8 @@ async def search_documents(request: SearchRequest):
 async def list_chunks(
     document_id: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    vectordb_service=Depends(get_vectordb_service)
 ):
     """
     List all chunks or chunks for a specific document.
@@ -140,7 +206,7 @@ async def list_chunks(
 
 
 @router.get("/list")
-async def list_documents():
+async def list_documents(vectordb_service=Depends(get_vectordb_service)):
     """
     List all documents in the vector database.
     """
@@ -154,6 +220,127 @@ async def list_documents():
         )
 
 
+@router.post("/reindex", response_model=ReindexResponse)
+async def reindex_documents(request: ReindexRequest):
+    """
+    Rebuild the vector database into a shadow collection.
+
+    Searches keep using the live collection until the rebuild is complete,
+    then the collection alias is switched atomically. Progress is reported
+    on the returned task and by GET /reindex.
+    """
+    try:
+        state = start_reindex(request.mode, resume=request.resume)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    try:
+        task = celery_app.send_task(REINDEX_TASK, args=[state["reindex_id"]])
+        state["task_id"] = task.id
+        write_reindex_state(state)
+
+        return ReindexResponse(
+            task_id=task.id,
+            reindex_id=state["reindex_id"],
+            mode=state["mode"],
+            source=state["source"],
+            target=state["target"],
+            message="Reindex task submitted successfully"
+        )
+    except Exception as e:
+        # Release the reindex, or every retry would be refused as already queued
+        state.update(status="failed", error=f"Failed to submit reindex task: {str(e)}")
+        write_reindex_state(state)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to submit reindex task: {str(e)}"
+        )
+
+
+@router.get("/reindex")
+async def get_reindex_status():
+    """
+    Get the state of the current (or last) reindex.
+    """
+    state = read_reindex_state()
+    if state is None:
+        raise HTTPException(status_code=404, detail="No reindex has been started")
+    return state
+
+
+@router.post("/{document_id}/rechunk", response_model=DocumentProcessResponse)
+async def rechunk_document(
+    document_id: str,
+    vectordb_service=Depends(get_vectordb_service)
+):
+    """
+    Chunk and embed a document again with the current chunking settings.
+
+    Starts from the cached Docling conversion, so the PDF is not converted
+    (and its pictures not described) again. The document's chunks are
+    replaced in place.
+    """
+    try:
+        exists = vectordb_service.find_document(document_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to look up document: {str(e)}"
+        )
+    if not exists:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+
+    try:
+        task = celery_app.send_task(RECHUNK_TASK, args=[document_id])
+        return DocumentProcessResponse(
+            task_id=task.id,
+            status="PENDING",
+            message="Re-chunk task submitted successfully"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to submit re-chunk task: {str(e)}"
+        )
+
+
+@router.delete("/{document_id}", response_model=DocumentDeleteResponse)
+async def delete_document(
+    document_id: str,
+    vectordb_service=Depends(get_vectordb_service)
+):
+    """
+    Delete all chunks of a document from the vector database.
+    """
+    try:
+        deleted = vectordb_service.delete_document(document_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to delete document: {str(e)}"
+        )
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    return DocumentDeleteResponse(document_id=document_id, chunks_deleted=deleted)
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    Download a captured profile in collapsed-stack format.
+
+    The profile ID is the task ID for processing tasks, or the
+    `profile_id` returned by a profiled search.
+    """
+    try:
+        path = get_profile_path(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
 @router.delete("/task/{task_id}")
 async def revoke_task(task_id: str):
     """
@@ -0,0 +1,78 @@
+"""
+Stored image endpoints.
+
+Images are addressed by the hash of their content, so a URL's response never
+changes: both variants are served with immutable cache headers and the hash
+as ETag.
+"""
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+from app.services.image_store import ImageStore
+
+router = APIRouter()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match lists ``etag`` (weak comparison, as RFC 9110 specifies) or is ``*``."""
+    for tag in request.headers.get("if-none-match", "").split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _cached_file(request: Request, path, etag: str, media_type: str) -> Response:
+    """Serve an immutable file, answering revalidations with 304."""
+    headers = {
+        "Cache-Control": f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable",
+        "ETag": etag,
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+def _validated(image_hash: str) -> str:
+    try:
+        return ImageStore.validate_hash(image_hash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{image_hash}")
+def get_image(image_hash: str, request: Request):
+    """
+    Download a stored figure at full resolution (PNG).
+    """
+    store = ImageStore()
+    path = store.original_path(_validated(image_hash))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Image {image_hash} not found")
+    return _cached_file(request, path, f'"{image_hash}"', "image/png")
+
+
+@router.get("/{image_hash}/thumbnail")
+def get_thumbnail(image_hash: str, request: Request):
+    """
+    Download a WebP thumbnail of a stored figure.
+
+    Thumbnails are generated after processing; one that is not there yet is
+    generated now.
+    """
+    store = ImageStore()
+    image_hash = _validated(image_hash)
+    etag = f'"{image_hash}-thumbnail"'
+    if _etag_matches(request, etag):
+        return _cached_file(request, None, etag, "image/webp")
+    if not store.original_path(image_hash).exists():
+        raise HTTPException(status_code=404, detail=f"Image {image_hash} not found")
+    try:
+        path = store.ensure_thumbnail(image_hash)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate thumbnail: {str(e)}"
+        )
+    return _cached_file(request, path, etag, "image/webp")
@@ -1,15 +1,39 @@
 """
 Celery application configuration with RabbitMQ RPC backend.
 """
+import time
+
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
 from app.core.config import settings
 
+# Task names, so the API can submit tasks without importing worker code
+PROCESS_PDF_TASK = "app.tasks.document_tasks.process_pdf_task"
+RECHUNK_TASK = "app.tasks.document_tasks.rechunk_document_task"
+REINDEX_TASK = "app.tasks.reindex_tasks.reindex_collection_task"
+THUMBNAIL_TASK = "app.tasks.image_tasks.generate_thumbnails_task"
+
+# PDF processing queue per priority; workers are allocated per queue, so a
+# bulk backfill never delays interactive uploads
+PDF_PRIORITY_QUEUES = {
+    "interactive": "pdf_interactive",
+    "normal": "pdf_processing",
+    "bulk": "pdf_bulk",
+}
+
 # Initialize Celery app with RabbitMQ as both broker and backend
 celery_app = Celery(
     "document_processor",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,  # RPC backend using RabbitMQ
-    include=["app.tasks.document_tasks"]
+    include=["app.tasks.document_tasks", "app.tasks.image_tasks", "app.tasks.reindex_tasks"]
 )
 
 # Celery configuration
@@ -22,6 +46,7 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=settings.CELERY_TASK_TIME_LIMIT,
     task_soft_time_limit=settings.CELERY_TASK_SOFT_TIME_LIMIT,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY,
     worker_prefetch_multiplier=settings.CELERY_WORKER_PREFETCH_MULTIPLIER,
     worker_max_tasks_per_child=1000,
     task_acks_late=True,
@@ -31,7 +56,81 @@ celery_app.conf.update(
     result_persistent=False,
 )
 
-# Task routes configuration
+# Task routes configuration (the default; PDF tasks pick their queue by priority)
 celery_app.conf.task_routes = {
-    "app.tasks.document_tasks.process_pdf_task": {"queue": "pdf_processing"},
+    PROCESS_PDF_TASK: {"queue": PDF_PRIORITY_QUEUES["normal"]},
+    RECHUNK_TASK: {"queue": PDF_PRIORITY_QUEUES["normal"]},
+    THUMBNAIL_TASK: {"queue": PDF_PRIORITY_QUEUES["normal"]},
+    # Long-running maintenance work stays off the processing workers
+    REINDEX_TASK: {"queue": "maintenance"},
 }
+
+
+def task_queue_names():
+    """Names of all queues tasks are routed to."""
+    routed = {route["queue"] for route in celery_app.conf.task_routes.values()}
+    return sorted(routed | set(PDF_PRIORITY_QUEUES.values()))
+
+
+def pdf_queue_for(priority: str) -> str:
+    """Queue for a PDF processing task of the given priority."""
+    return PDF_PRIORITY_QUEUES[priority]
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, routing_key=None, **kwargs):
+    """Record when and where a task was queued, for the queue wait metric."""
+    headers.setdefault("enqueued_at", time.time())
+    headers.setdefault("enqueued_queue", routing_key)
+
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    """Expose worker metrics from the parent worker process."""
+    from app.core.metrics import start_worker_exporter
+    start_worker_exporter()
+
+
+@worker_init.connect
+def configure_cpu_budget(sender=None, **kwargs):
+    """Split the cores between the pool's children (the pool size may come from -c)."""
+    if not settings.WORKER_CPU_BUDGET_ENABLED:
+        return
+    from app.utils.cpu_budget import configure_worker_pool
+    configure_worker_pool(sender.concurrency)
+
+
+@worker_process_init.connect
+def apply_child_cpu_budget(**kwargs):
+    """Limit each prefork child to its share of the cores."""
+    if not settings.WORKER_CPU_BUDGET_ENABLED:
+        return
+    from billiard.process import current_process
+    from app.utils.cpu_budget import apply_cpu_budget, threads_per_child
+    apply_cpu_budget(
+        threads_per_child(),
+        child_index=getattr(current_process(), "index", None),
+        pin=settings.WORKER_CPU_AFFINITY,
+    )
+
+
+@worker_process_shutdown.connect
+def cleanup_child_metrics(pid=None, **kwargs):
+    """Discard live gauges of a prefork child that exited."""
+    from app.core.metrics import mark_process_dead
+    mark_process_dead(pid)
+
+
+@task_prerun.connect
+def track_task_started(sender=None, task=None, **kwargs):
+    """Count the task as in flight and record how long it waited in its queue."""
+    from app.core.metrics import TASKS_IN_FLIGHT, observe_queue_wait
+    TASKS_IN_FLIGHT.labels(task=sender.name).inc()
+    observe_queue_wait(task.request)
+
+
+@task_postrun.connect
+def track_task_finished(sender=None, **kwargs):
+    """Remove the task from the in-flight count."""
+    from app.core.metrics import TASKS_IN_FLIGHT
+    TASKS_IN_FLIGHT.labels(task=sender.name).dec()
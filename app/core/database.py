@@ -1,18 +1,48 @@
 """
 Global ChromaDB client management.
+
+chromadb is imported on first use so importing this module stays cheap
+for the API process.
+
+The live collection is resolved through an alias file in CHROMA_PERSIST_DIR,
+so a reindex can build a shadow collection and switch to it atomically.
+
+With ``CHROMA_SHARD_BY`` set, chunks are stored in one collection per tenant
+(or category) instead, named after the live collection: ``<live>__<shard>``.
+Chunks without a shard key stay in the live collection itself, as do chunks
+written by external indexers (the Confluence service), which are not
+shard-aware. Reads therefore always include the live collection.
 """
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Optional
+
 from app.core.config import settings
 
+ALIAS_FILE = "collection_alias.json"
+SHARD_SEPARATOR = "__"
+
+# Metadata key set on chunks written by external indexers rather than the PDF pipeline
+EXTERNAL_SOURCE_KEY = "source"
+
 # Global client instance
 _chroma_client = None
 
+# (mtime, collection name) of the alias file last read
+_alias_cache = (None, None)
+
 
 def get_chroma_client(force_refresh: bool = False):
     """Get or create the global ChromaDB client."""
     global _chroma_client
     if _chroma_client is None or force_refresh:
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
         _chroma_client = chromadb.PersistentClient(
             path=settings.CHROMA_PERSIST_DIR,
             settings=ChromaSettings(anonymized_telemetry=False)
@@ -20,8 +50,68 @@ def get_chroma_client(force_refresh: bool = False):
     return _chroma_client
 
 
+def _alias_path() -> Path:
+    return Path(settings.CHROMA_PERSIST_DIR) / ALIAS_FILE
+
+
+def get_live_collection_name() -> str:
+    """Name of the collection searches and writes currently use."""
+    global _alias_cache
+    try:
+        mtime = _alias_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return settings.CHROMA_COLLECTION_NAME
+    if _alias_cache[0] != mtime:
+        _alias_cache = (mtime, json.loads(_alias_path().read_text())["collection"])
+    return _alias_cache[1]
+
+
+def set_live_collection_name(name: str, previous: Optional[str] = None):
+    """Atomically point the alias at another collection (write-then-rename)."""
+    path = _alias_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{ALIAS_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({
+        "collection": name,
+        "previous": previous,
+        "switched_at": time.time(),
+    }))
+    os.replace(tmp, path)
+
+
 def get_collection(collection_name: str = None):
-    """Get or create a collection."""
+    """Get or create a collection; defaults to the live (aliased) collection."""
     client = get_chroma_client()
-    name = collection_name or settings.CHROMA_COLLECTION_NAME
-    return client.get_or_create_collection(name=name)
\ No newline at end of file
+    name = collection_name or get_live_collection_name()
+    return client.get_or_create_collection(name=name)
+
+
+def shard_key(metadata: dict) -> str:
+    """Shard a chunk belongs to; empty for the live collection itself."""
+    if not settings.CHROMA_SHARD_BY or EXTERNAL_SOURCE_KEY in metadata:
+        return ""
+    return str(metadata.get(settings.CHROMA_SHARD_BY) or "")
+
+
+def shard_collection_name(key: str, base: Optional[str] = None) -> str:
+    """
+    Collection of a shard of ``base`` (the live collection by default).
+
+    The key is reduced to characters Chroma allows in names, and a digest
+    keeps keys that reduce to the same slug apart.
+    """
+    base = base or get_live_collection_name()
+    if not key:
+        return base
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", key).strip("-")[:16]
+    digest = hashlib.md5(key.encode()).hexdigest()[:8]
+    return f"{base}{SHARD_SEPARATOR}{slug}-{digest}" if slug else f"{base}{SHARD_SEPARATOR}{digest}"
+
+
+def get_shard_names(base: Optional[str] = None) -> List[str]:
+    """Names of ``base`` (the live collection by default) and all of its shards."""
+    base = base or get_live_collection_name()
+    prefix = f"{base}{SHARD_SEPARATOR}"
+    # Chroma returns collection objects or names, depending on the version
+    names = (getattr(c, "name", c) for c in get_chroma_client().list_collections())
+    return [base] + sorted(name for name in names if name.startswith(prefix))
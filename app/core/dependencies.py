@@ -1,18 +1,34 @@
 """
 FastAPI dependency injection functions.
+
+Services are imported and built on first use so the API process does not
+pay for OpenAI, Chroma or Docling at import time. Docling is only ever
+needed by Celery workers.
 """
-from app.services.vectordb_service import VectorDBService
-from app.services.embedding_service import EmbeddingService
-from app.services.document_service import DocumentService
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.services.vectordb_service import VectorDBService
+    from app.services.embedding_service import EmbeddingService
+    from app.services.document_service import DocumentService
+
 
-def get_vectordb_service() -> VectorDBService:
-    """Get VectorDB service instance."""
+@lru_cache()
+def get_vectordb_service() -> "VectorDBService":
+    """Get the shared VectorDB service instance."""
+    from app.services.vectordb_service import VectorDBService
     return VectorDBService()
 
-def get_embedding_service() -> EmbeddingService:
-    """Get Embedding service instance."""
+
+@lru_cache()
+def get_embedding_service() -> "EmbeddingService":
+    """Get the shared Embedding service instance."""
+    from app.services.embedding_service import EmbeddingService
     return EmbeddingService()
 
-def get_document_service() -> DocumentService:
+
+def get_document_service() -> "DocumentService":
     """Get Document service instance."""
+    from app.services.document_service import DocumentService
     return DocumentService()
@@ -0,0 +1,219 @@
+"""
+Prometheus metrics shared by the API process and Celery workers.
+
+Celery's prefork children each hold their own metric values, so workers
+must run with ``PROMETHEUS_MULTIPROC_DIR`` set for the exporter in the
+parent process to aggregate them.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+# prometheus_client picks its value backend at import time, so the
+# multiprocess directory must be in the environment before the import.
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Pipeline stage timings
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Time spent in each document pipeline stage",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+# HTTP timings
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"],
+)
+
+# Throughput counters
+CHUNKS_TOTAL = Counter("pipeline_chunks_total", "Chunks produced by the pipeline", ["category"])
+PAGES_TOTAL = Counter("pipeline_pages_total", "PDF pages converted by Docling")
+TOKENS_TOTAL = Counter("openai_tokens_total", "Tokens sent to OpenAI", ["model", "purpose"])
+PRESCAN_PAGES_TOTAL = Counter("pdf_prescan_pages_total", "Pages by pre-scan OCR decision", ["decision"])
+CACHE_HITS_TOTAL = Counter("cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES_TOTAL = Counter("cache_misses_total", "Cache misses", ["cache"])
+
+# Single-writer commits
+WRITER_COMMIT_RECORDS = Histogram(
+    "chroma_writer_commit_records",
+    "Records per Chroma write commit",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+
+# OpenAI governor
+GOVERNOR_WAIT_SECONDS = Histogram(
+    "openai_governor_wait_seconds",
+    "Time calls waited for OpenAI budget",
+    ["model", "priority"],
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+OPENAI_RATE_LIMITED_TOTAL = Counter("openai_rate_limited_total", "429 responses from OpenAI", ["model"])
+
+# Memory admission control
+TASK_PEAK_RSS_MB = Histogram(
+    "pdf_task_peak_rss_mb",
+    "Peak RSS of the worker process during a PDF processing task",
+    ["profile"],
+    buckets=(250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000, 16000),
+)
+MEMORY_DEFERRED_TOTAL = Counter("pdf_task_memory_deferred_total", "PDF tasks put back on the queue for lack of memory")
+
+# Time between publishing a task and a worker starting it
+QUEUE_WAIT_SECONDS = Histogram(
+    "celery_queue_wait_seconds",
+    "Time tasks waited in their queue before a worker started them",
+    ["queue", "task"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Worker state
+TASKS_IN_FLIGHT = Gauge(
+    "celery_tasks_in_flight",
+    "Tasks currently executing",
+    ["task"],
+    multiprocess_mode="livesum",
+)
+
+# Docling records its own per-step timings on the conversion result; these
+# are the steps we export, mapped onto our stage names.
+DOCLING_TIMING_STAGES = {
+    "doc_enrich": "picture_description",
+    "page_parse": "docling_page_parse",
+    "layout": "docling_layout",
+    "table_structure": "docling_table_structure",
+    "ocr": "docling_ocr",
+}
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a block of work and record it under ``stage`` with its outcome."""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage=stage, outcome=outcome).observe(
+            time.perf_counter() - start
+        )
+
+
+def observe_queue_wait(request) -> None:
+    """Record the queue wait of a task from the headers stamped at publish time."""
+    headers = request.headers or {}
+    enqueued_at = getattr(request, "enqueued_at", None) or headers.get("enqueued_at")
+    if enqueued_at is None:
+        return
+    queue = (
+        getattr(request, "enqueued_queue", None)
+        or headers.get("enqueued_queue")
+        or (request.delivery_info or {}).get("routing_key")
+        or "unknown"
+    )
+    QUEUE_WAIT_SECONDS.labels(queue=queue, task=request.task).observe(
+        max(time.time() - float(enqueued_at), 0.0)
+    )
+
+
+def observe_docling_timings(conv_result) -> None:
+    """Export the step timings Docling collected for a conversion."""
+    timings = getattr(conv_result, "timings", None) or {}
+    for key, stage in DOCLING_TIMING_STAGES.items():
+        item = timings.get(key)
+        if item is None:
+            continue
+        for value in getattr(item, "times", []):
+            PIPELINE_STAGE_SECONDS.labels(stage=stage, outcome="success").observe(value)
+
+
+class QueueDepthCollector:
+    """Reports the number of ready messages in each Celery queue at scrape time."""
+
+    def __init__(self, app, queues: Iterable[str]):
+        self.app = app
+        self.queues = list(queues)
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "celery_queue_depth", "Messages waiting in a Celery queue", labels=["queue"]
+        )
+        try:
+            with self.app.connection_for_read() as conn:
+                for queue in self.queues:
+                    # A passive declare on a missing queue closes the channel,
+                    # so each queue gets its own.
+                    try:
+                        with conn.channel() as channel:
+                            _, depth, _ = channel.queue_declare(queue=queue, passive=True)
+                        gauge.add_metric([queue], depth)
+                    except Exception as e:
+                        logger.debug(f"Queue depth unavailable for {queue}: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to read queue depths from broker: {e}")
+        yield gauge
+
+
+_registry: Optional[CollectorRegistry] = None
+
+
+def get_registry() -> CollectorRegistry:
+    """Get the registry to expose, aggregating worker processes if configured."""
+    global _registry
+    if _registry is None:
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            _registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(_registry)
+        else:
+            _registry = REGISTRY
+        # Imported here so the metrics module stays importable from celery_app
+        from app.core.celery_app import celery_app, task_queue_names
+        _registry.register(QueueDepthCollector(celery_app, task_queue_names()))
+    return _registry
+
+
+def render_metrics() -> tuple:
+    """Render the registry in the Prometheus text format."""
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter() -> None:
+    """Serve worker metrics over HTTP from the Celery parent process."""
+    if not settings.METRICS_ENABLED:
+        return
+    start_http_server(settings.METRICS_WORKER_PORT, registry=get_registry())
+    logger.info(f"Worker metrics exporter listening on :{settings.METRICS_WORKER_PORT}")
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop live gauges of an exited prefork child."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
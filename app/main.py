@@ -1,14 +1,19 @@
 """
 FastAPI main application module with CORS and file upload support.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.routing import Match
 from contextlib import asynccontextmanager
 import os
+import time
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.api.v1.endpoints import documents, health, upload
+from app.core.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from app.api.v1.endpoints import documents, health, images, upload
 
 
 @asynccontextmanager
@@ -17,6 +22,7 @@ async def lifespan(app: FastAPI):
     # Startup - Create directories
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+    os.makedirs(settings.IMAGE_STORE_DIR, exist_ok=True)
     os.makedirs(settings.CHROMA_PERSIST_DIR, exist_ok=True)
     print(f"Starting {settings.PROJECT_NAME}")
     yield
@@ -29,7 +35,8 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description="PDF processing service with Docling, Celery, and Vector DB",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware configuration
@@ -43,6 +50,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+    gzip_level=settings.RESPONSE_GZIP_LEVEL,
+    brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+)
+
+
+def _route_template(request: Request) -> str:
+    """Resolve the route path template so metrics labels stay low-cardinality."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency of every API request."""
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=_route_template(request),
+            status=status,
+        ).observe(time.perf_counter() - start)
+
+
 # Mount static files for serving uploaded files
 app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 app.mount("/outputs", StaticFiles(directory=settings.OUTPUT_DIR), name="outputs")
@@ -66,6 +107,19 @@ app.include_router(
     tags=["documents"]
 )
 
+app.include_router(
+    images.router,
+    prefix=f"{settings.API_V1_PREFIX}/images",
+    tags=["images"]
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (sync, as reading queue depths hits the broker)."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 @app.get("/")
 async def root():
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for document-related requests and responses.
 """
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Literal
 from pydantic import BaseModel, Field
 
 
@@ -11,6 +11,17 @@ class DocumentProcessRequest(BaseModel):
     pdf_path_or_url: str = Field(..., description="Local path or URL to PDF")
     category: str = Field(..., description="Document category")
     subcategory: Optional[str] = Field(None, description="Document subcategory")
+    tenant: Optional[str] = Field(None, description="Application or team the document belongs to")
+    profile: bool = Field(False, description="Capture a sampling profile of the task")
+    priority: Literal["interactive", "normal", "bulk"] = Field(
+        "normal",
+        description="interactive: user uploads; normal: default queue; bulk: backfills and batch imports"
+    )
+    conversion_profile: Optional[Literal["fast", "standard", "full", "low_memory"]] = Field(
+        None,
+        description="fast: text and tables only; standard: with picture descriptions; full: with page renders; low_memory: fast, one page at a time. "
+                    "Defaults to the category's profile"
+    )
 
 
 class DocumentMetadata(BaseModel):
@@ -20,6 +31,7 @@ class DocumentMetadata(BaseModel):
     document_id: str
     category: str
     subcategory: str = ""
+    tenant: str = ""
     page_numbers: str = ""
     title: str = ""
     source_path: str
@@ -29,6 +41,10 @@ class DocumentMetadata(BaseModel):
     image_references: str = ""
     image_descriptions: str = ""
     figure_captions: str = ""
+    conversion_profile: str = ""
+    prev_chunk_id: str = ""
+    next_chunk_id: str = ""
+    linked_chunk_ids: str = ""
 
 
 class DocumentChunk(BaseModel):
@@ -54,17 +70,51 @@ class SearchRequest(BaseModel):
     n_results: int = Field(5, ge=1, le=100, description="Number of results")
     category_filter: Optional[str] = Field(None, description="Filter by category")
     subcategory_filter: Optional[str] = Field(None, description="Filter by subcategory")
+    tenant_filter: Optional[str] = Field(None, description="Filter by tenant")
     images_only: bool = Field(False, description="Search only chunks with images")
     tables_only: bool = Field(False, description="Search only chunks with tables")
+    image_variant: Literal["thumbnail", "original"] = Field(
+        "thumbnail",
+        description="Whether image_references point at thumbnails or full-size images"
+    )
+    expand: List[Literal["neighbors", "linked"]] = Field(
+        default_factory=list,
+        description="Return each result with its context: neighbors: previous and next chunk; "
+                    "linked: chunks with the figures and tables it refers to, or referring to its own"
+    )
+    fields: List[Literal["document_text", "metadata"]] = Field(
+        default_factory=lambda: ["document_text", "metadata"],
+        description="Fields returned besides chunk_id and distance; [] for IDs and distances only"
+    )
+    text_length: Optional[int] = Field(None, ge=1, description="Truncate document_text to a snippet of this many characters")
+    metadata_keys: Optional[List[str]] = Field(None, description="Return only these metadata keys")
+    profile: bool = Field(False, description="Capture a sampling profile of the search")
+
+
+class ContextChunk(BaseModel):
+    """Chunk returned as context of a search result."""
+
+    chunk_id: str
+    document_text: Optional[str] = None
+    metadata: Optional[Dict] = None
+
+
+class SearchResultContext(BaseModel):
+    """Chunks around a search result."""
+
+    previous: Optional[ContextChunk] = None
+    next: Optional[ContextChunk] = None
+    linked: List[ContextChunk] = []
 
 
 class SearchResult(BaseModel):
     """Single search result."""
 
     chunk_id: str
-    document_text: str
-    metadata: Dict
+    document_text: Optional[str] = Field(None, description="Omitted unless requested in fields")
+    metadata: Optional[Dict] = Field(None, description="Omitted unless requested in fields")
     distance: float
+    context: Optional[SearchResultContext] = Field(None, description="Present when the search asked to expand results")
 
 
 class SearchResponse(BaseModel):
@@ -73,6 +123,7 @@ class SearchResponse(BaseModel):
     query: str
     results: List[SearchResult]
     count: int
+    profile_id: Optional[str] = Field(None, description="ID of the captured profile, if any")
 
 
 class ChunksListResponse(BaseModel):
@@ -82,3 +133,31 @@ class ChunksListResponse(BaseModel):
     count: int
     limit: int
     offset: int
+
+
+class DocumentDeleteResponse(BaseModel):
+    """Response schema for deleting a document."""
+
+    document_id: str
+    chunks_deleted: int
+
+
+class ReindexRequest(BaseModel):
+    """Request schema for rebuilding the vector database."""
+
+    mode: Literal["reembed", "reprocess"] = Field(
+        "reembed",
+        description="reembed: new embeddings for stored chunks; reprocess: chunk PDFs again from their cached conversions"
+    )
+    resume: bool = Field(True, description="Continue an unfinished reindex of the same mode")
+
+
+class ReindexResponse(BaseModel):
+    """Response schema for a submitted reindex."""
+
+    task_id: str = Field(..., description="Celery task ID")
+    reindex_id: str
+    mode: str
+    source: str = Field(..., description="Live collection being rebuilt")
+    target: str = Field(..., description="Shadow collection that becomes live when done")
+    message: str
@@ -0,0 +1,212 @@
+"""
+Single-writer access to the Chroma collections.
+
+Every process that opens its own PersistentClient on ``CHROMA_PERSIST_DIR``
+competes for the same SQLite/HNSW files. When ``CHROMA_WRITER_URL`` is set,
+workers send already-embedded batches to the writer service
+(``app.writer_main``), the only process that writes. Its
+``GroupCommitWriter`` merges concurrent requests into large commits.
+Without a writer URL, writes go straight to the local client as before.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_collection
+from app.core.metrics import WRITER_COMMIT_RECORDS, track_stage
+
+logger = logging.getLogger(__name__)
+
+WRITE_OPS = ("upsert", "update", "delete")
+
+_STOP = object()
+
+
+def check_write(op: str, payload: dict):
+    """
+    Reject malformed writes before they are queued.
+
+    Raises:
+        ValueError: If the op is unknown or a delete has no ids/filter
+    """
+    if op not in WRITE_OPS:
+        raise ValueError(f"Unknown write op {op!r}")
+    if op == "delete" and not (payload.get("ids") or payload.get("where")):
+        raise ValueError("delete needs ids or a where filter")
+
+
+def apply_write(op: str, collection_name: Optional[str] = None, **payload):
+    """Apply one write to a collection (``None`` means the live collection)."""
+    check_write(op, payload)
+    collection = get_collection(collection_name)
+    if op == "upsert":
+        collection.upsert(**payload)
+    elif op == "update":
+        collection.update(**payload)
+    else:
+        collection.delete(**payload)
+
+
+class GroupCommitWriter:
+    """
+    Background thread that owns all writes.
+
+    Requests queue up while a commit is running; the next commit takes every
+    queued request (up to ``max_batch`` records, waiting at most ``max_wait``
+    seconds for more) and merges consecutive upserts into the same collection
+    into one call. Other operations are applied in arrival order.
+    """
+
+    def __init__(self, max_batch: Optional[int] = None, max_wait: Optional[float] = None):
+        self.max_batch = max_batch or settings.WRITER_MAX_BATCH
+        self.max_wait = settings.WRITER_MAX_WAIT if max_wait is None else max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="chroma-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Commit everything already queued, then stop."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def submit(self, op: str, collection_name: Optional[str] = None, **payload) -> Future:
+        """Queue a write; the future resolves once it is committed."""
+        check_write(op, payload)
+        future = Future()
+        self._queue.put((op, collection_name, payload, future))
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            group = [first]
+            records = self._size(first)
+            deadline = time.monotonic() + self.max_wait
+            while records < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                group.append(item)
+                records += self._size(item)
+            self._commit(group)
+
+    @staticmethod
+    def _size(item) -> int:
+        _, _, payload, _ = item
+        return len(payload.get("ids") or []) or 1
+
+    def _commit(self, group: List[tuple]):
+        for op, collection_name, items in self._runs(group):
+            if op == "upsert" and len(items) > 1:
+                try:
+                    self._merged_upsert(collection_name, items)
+                    for _, _, _, future in items:
+                        future.set_result(None)
+                    continue
+                except Exception as e:
+                    # Retry one by one so a single bad batch doesn't fail the others
+                    logger.warning(f"Group upsert of {len(items)} batches failed, retrying individually: {str(e)}")
+            for _, _, payload, future in items:
+                try:
+                    with track_stage(f"chroma_{op}"):
+                        apply_write(op, collection_name, **payload)
+                    WRITER_COMMIT_RECORDS.observe(self._size((op, collection_name, payload, future)))
+                    future.set_result(None)
+                except Exception as e:
+                    future.set_exception(e)
+
+    @staticmethod
+    def _runs(group: List[tuple]):
+        """Split the group into runs of consecutive requests with the same op and collection."""
+        runs = []
+        for item in group:
+            op, collection_name = item[0], item[1]
+            if runs and runs[-1][0] == op and runs[-1][1] == collection_name:
+                runs[-1][2].append(item)
+            else:
+                runs.append((op, collection_name, [item]))
+        return runs
+
+    @staticmethod
+    def _merged_upsert(collection_name: Optional[str], items: List[tuple]):
+        # Later batches win for IDs sent more than once (Chroma rejects duplicate IDs in one call)
+        merged: Dict[str, tuple] = {}
+        for _, _, payload, _ in items:
+            for i, chunk_id in enumerate(payload["ids"]):
+                merged[chunk_id] = (
+                    payload["documents"][i] if payload.get("documents") else None,
+                    payload["metadatas"][i] if payload.get("metadatas") else None,
+                    payload["embeddings"][i],
+                )
+        ids = list(merged)
+        with track_stage("chroma_group_commit"):
+            apply_write(
+                "upsert",
+                collection_name,
+                ids=ids,
+                documents=[merged[i][0] for i in ids],
+                metadatas=[merged[i][1] for i in ids],
+                embeddings=[merged[i][2] for i in ids],
+            )
+        WRITER_COMMIT_RECORDS.observe(len(ids))
+
+
+class LocalWriter:
+    """Writes directly to the local client (no writer service configured)."""
+
+    def upsert(self, ids, documents, metadatas, embeddings, collection_name: Optional[str] = None):
+        with track_stage("chroma_insert"):
+            apply_write("upsert", collection_name, ids=ids, documents=documents,
+                        metadatas=metadatas, embeddings=embeddings)
+
+    def update(self, ids, metadatas, collection_name: Optional[str] = None):
+        apply_write("update", collection_name, ids=ids, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None, collection_name: Optional[str] = None):
+        apply_write("delete", collection_name, ids=ids, where=where)
+
+
+class WriterClient:
+    """Sends writes to the writer service; each call returns once the write is committed."""
+
+    def __init__(self, base_url: str):
+        import httpx
+
+        self.http = httpx.Client(base_url=base_url.rstrip("/"), timeout=settings.WRITER_TIMEOUT)
+
+    def _send(self, op: str, collection_name: Optional[str], **payload):
+        with track_stage("chroma_writer_request"):
+            response = self.http.post("/writes", json={"op": op, "collection": collection_name, **payload})
+        response.raise_for_status()
+
+    def upsert(self, ids, documents, metadatas, embeddings, collection_name: Optional[str] = None):
+        self._send("upsert", collection_name, ids=ids, documents=documents,
+                   metadatas=metadatas, embeddings=embeddings)
+
+    def update(self, ids, metadatas, collection_name: Optional[str] = None):
+        self._send("update", collection_name, ids=ids, metadatas=metadatas)
+
+    def delete(self, ids=None, where=None, collection_name: Optional[str] = None):
+        self._send("delete", collection_name, ids=ids, where=where)
+
+
+@lru_cache()
+def get_chroma_writer():
+    """WriterClient when ``CHROMA_WRITER_URL`` is set, otherwise a LocalWriter."""
+    if settings.CHROMA_WRITER_URL:
+        return WriterClient(settings.CHROMA_WRITER_URL)
+    return LocalWriter()
@@ -0,0 +1,97 @@
+"""
+Named Docling pipeline profiles.
+
+- ``fast``: text and tables only; no rendered images, no picture
+  descriptions, fast table structure mode
+- ``standard``: picture images with descriptions, accurate tables; no page
+  or table renders (nothing reads them)
+- ``full``: everything, including page and table renders
+- ``low_memory``: like ``fast`` at 1x scale, one page at a time; used
+  automatically for files that keep crashing workers
+
+A document's profile is, in order: the one given with the request, the one
+configured for its category (``CONVERSION_PROFILE_BY_CATEGORY``), or
+``CONVERSION_PROFILE``.
+"""
+from typing import Optional
+
+from docling.datamodel.pipeline_options import (
+    PdfPipelineOptions,
+    TableFormerMode,
+    TableStructureOptions,
+)
+
+from app.core.config import settings
+from app.services.picture_description import GovernedPictureDescriptionApiOptions, governed_picture_description_options
+
+CONVERSION_PROFILES = ("fast", "standard", "full", "low_memory")
+
+# Docling pages processed per batch, where a profile differs from Docling's default
+PROFILE_PAGE_BATCH_SIZES = {"low_memory": 1}
+
+
+def resolve_profile(profile: Optional[str], category: Optional[str] = None) -> str:
+    """
+    Profile to convert a document with.
+
+    Raises:
+        ValueError: If the resolved profile is unknown
+    """
+    resolved = profile or settings.CONVERSION_PROFILE_BY_CATEGORY.get(category or "") or settings.CONVERSION_PROFILE
+    if resolved not in CONVERSION_PROFILES:
+        raise ValueError(f"Unknown conversion profile {resolved!r}, expected one of {CONVERSION_PROFILES}")
+    return resolved
+
+
+def _picture_description_options() -> GovernedPictureDescriptionApiOptions:
+    return governed_picture_description_options(
+        url="https://api.openai.com/v1/chat/completions",
+        prompt="Describe this image in detail, including any text, charts, diagrams, or visual elements.",
+        params=dict(model=settings.OPENAI_MODEL),
+        headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+        timeout=settings.PICTURE_DESCRIPTION_TIMEOUT,
+    )
+
+
+def build_pipeline_options(profile: str) -> PdfPipelineOptions:
+    """Docling PDF pipeline options for a profile."""
+    if profile == "fast":
+        return PdfPipelineOptions(
+            do_picture_description=False,
+            generate_picture_images=False,
+            generate_table_images=False,
+            generate_page_images=False,
+            table_structure_options=TableStructureOptions(mode=TableFormerMode.FAST),
+        )
+    if profile == "standard":
+        return PdfPipelineOptions(
+            do_picture_description=True,
+            picture_description_options=_picture_description_options(),
+            enable_remote_services=True,
+            generate_picture_images=True,
+            generate_table_images=False,
+            generate_page_images=False,
+            table_structure_options=TableStructureOptions(mode=TableFormerMode.ACCURATE),
+            images_scale=settings.IMAGES_SCALE,
+        )
+    if profile == "full":
+        return PdfPipelineOptions(
+            do_picture_description=True,
+            picture_description_options=_picture_description_options(),
+            enable_remote_services=True,
+            generate_picture_images=True,
+            generate_table_images=True,
+            generate_page_images=True,
+            table_structure_options=TableStructureOptions(mode=TableFormerMode.ACCURATE),
+            images_scale=settings.IMAGES_SCALE,
+        )
+    if profile == "low_memory":
+        return PdfPipelineOptions(
+            do_picture_description=False,
+            generate_picture_images=False,
+            generate_table_images=False,
+            generate_page_images=False,
+            table_structure_options=TableStructureOptions(mode=TableFormerMode.FAST),
+            images_scale=1.0,
+        )
+    raise ValueError(f"Unknown conversion profile {profile!r}, expected one of {CONVERSION_PROFILES}")
@@ -0,0 +1,126 @@
+"""
+Cache of converted Docling documents.
+
+Conversion (layout, OCR, tables, picture descriptions) is by far the most
+expensive part of processing a PDF, and its output does not depend on the
+chunking settings. Each converted ``DoclingDocument`` is stored as gzipped
+JSON under ``DOCLING_CACHE_DIR``, keyed by the file's content hash and a hash
+of the pipeline options, so re-chunking and re-embedding start from the
+cached document instead of the PDF.
+
+Layout::
+
+    <file_sha256>/<options_hash>.json.gz   converted document
+    documents/<document_id>.json           latest conversion of a document
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+from docling_core.types.doc import DoclingDocument
+
+from app.core.config import settings
+from app.core.metrics import CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, track_stage
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = "docling"
+
+
+def file_hash(data: bytes) -> str:
+    """Content hash of a source file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def options_hash(pipeline_options) -> str:
+    """
+    Hash of everything that changes conversion output.
+
+    Credentials and thread settings are left out, and the Docling version
+    is included so an upgrade invalidates the cache.
+    """
+    from importlib.metadata import version
+
+    options = pipeline_options.model_dump(
+        mode="json",
+        exclude={"picture_description_options": {"headers"}, "accelerator_options": True},
+    )
+    key = json.dumps({"docling": version("docling"), "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+class DoclingCache:
+    """Stores and loads converted documents."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir or settings.DOCLING_CACHE_DIR)
+
+    def _path(self, source_hash: str, opts_hash: str) -> Path:
+        return self.cache_dir / source_hash / f"{opts_hash}.json.gz"
+
+    def _record_path(self, document_id: str) -> Path:
+        return self.cache_dir / "documents" / f"{document_id}.json"
+
+    def get(self, source_hash: str, opts_hash: str) -> Optional[DoclingDocument]:
+        """Cached conversion of a file, or None."""
+        path = self._path(source_hash, opts_hash)
+        if not path.exists():
+            CACHE_MISSES_TOTAL.labels(cache=CACHE_NAME).inc()
+            return None
+        try:
+            with track_stage("docling_cache_load"), gzip.open(path, "rt", encoding="utf-8") as f:
+                doc = DoclingDocument.model_validate_json(f.read())
+        except Exception as e:
+            logger.warning(f"Discarding unreadable Docling cache entry {path}: {str(e)}")
+            CACHE_MISSES_TOTAL.labels(cache=CACHE_NAME).inc()
+            return None
+        CACHE_HITS_TOTAL.labels(cache=CACHE_NAME).inc()
+        return doc
+
+    def put(self, source_hash: str, opts_hash: str, doc: DoclingDocument, document_id: str, source_path: str):
+        """Store a conversion and make it the latest one for ``document_id``."""
+        data = doc.export_to_dict()
+        # Page renders are only needed during conversion; pictures and tables keep their own images
+        for page in data.get("pages", {}).values():
+            page.pop("image", None)
+
+        path = self._path(source_hash, opts_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with track_stage("docling_cache_store"):
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+
+        record = self._record_path(document_id)
+        record.parent.mkdir(parents=True, exist_ok=True)
+        tmp = record.with_name(f"{record.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({
+            "source_path": source_path,
+            "file_hash": source_hash,
+            "options_hash": opts_hash,
+        }))
+        os.replace(tmp, record)
+
+    def get_for_document(self, document_id: str, opts_hashes: Iterable[str]) -> Optional[tuple]:
+        """
+        Latest cached conversion of a document, if made with one of the current option sets.
+
+        Returns:
+            Optional[tuple]: (DoclingDocument, source_path), or None if there is
+            no usable cache entry
+        """
+        record_path = self._record_path(document_id)
+        if not record_path.exists():
+            CACHE_MISSES_TOTAL.labels(cache=CACHE_NAME).inc()
+            return None
+        record = json.loads(record_path.read_text())
+        if record["options_hash"] not in set(opts_hashes):
+            CACHE_MISSES_TOTAL.labels(cache=CACHE_NAME).inc()
+            return None
+        doc = self.get(record["file_hash"], record["options_hash"])
+        return (doc, record["source_path"]) if doc is not None else None
@@ -4,26 +4,45 @@ Document processing service.
 import os
 import hashlib
 import logging
+from io import BytesIO
 from typing import List, Optional, Tuple
 from pathlib import Path
 
+import httpx
 from openai import OpenAI
 from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.pipeline_options import PdfPipelineOptions, PictureDescriptionApiOptions
-from docling.datamodel.base_models import InputFormat
+from docling.datamodel.base_models import DocumentStream, InputFormat
+from docling.datamodel.settings import settings as docling_settings
 from docling.chunking import HybridChunker
 from docling_core.transforms.chunker.tokenizer.openai import OpenAITokenizer
-from docling_core.types.doc import PictureItem, TableItem, DocItemLabel
+from docling_core.types.doc import DoclingDocument, PictureItem, TableItem, DocItemLabel
 from docling_core.types.doc.document import ImageRefMode
 import tiktoken
 
 from app.core.config import settings
+from app.core.metrics import track_stage, observe_docling_timings, CHUNKS_TOTAL, PAGES_TOTAL
+from app.services.conversion_profiles import PROFILE_PAGE_BATCH_SIZES, build_pipeline_options, resolve_profile
+from app.services.docling_cache import DoclingCache, file_hash, options_hash
+from app.services.image_store import ImageStore
+from app.services.pdf_prescan import prescan_pdf
+from app.utils.chunk_links import adjacency_metadata, chunk_links
+from app.utils.cpu_budget import threads_per_child
 from app.utils.docling_utils import save_image_ref
 from app.utils.image_utils import extract_image_info_from_chunk, get_image_info
 
 logger = logging.getLogger(__name__)
 
 
+def read_pdf_source(pdf_path_or_url: str) -> bytes:
+    """Bytes of the PDF, downloading it if it is a URL."""
+    if pdf_path_or_url.startswith(('http://', 'https://')):
+        with track_stage("pdf_download"):
+            response = httpx.get(pdf_path_or_url, follow_redirects=True, timeout=settings.PDF_DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+    return Path(pdf_path_or_url).read_bytes()
+
+
 class DocumentService:
     """Service for processing documents with Docling."""
 
@@ -33,63 +52,181 @@ class DocumentService:
             tokenizer=tiktoken.encoding_for_model("gpt-4o"),
             max_tokens=128 * 1024,
         )
-        self.converter = self._initialize_converter()
-
-    def _initialize_converter(self) -> DocumentConverter:
-        """Initialize Docling document converter."""
-        pipeline_options = PdfPipelineOptions(
-            do_picture_description=True,
-            picture_description_options=PictureDescriptionApiOptions(
-                url="https://api.openai.com/v1/chat/completions",
-                prompt="Describe this image in detail, including any text, charts, diagrams, or visual elements.",
-                params=dict(model=settings.OPENAI_MODEL),
-                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
-                timeout=settings.PICTURE_DESCRIPTION_TIMEOUT,
-            ),
-            enable_remote_services=True,
-            generate_picture_images=True,
-            generate_table_images=True,
-            generate_page_images=True,
-            images_scale=settings.IMAGES_SCALE,
-        )
+        self._converters = {}
+        self.cache = DoclingCache()
 
-        return DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
+        # Have Docling record per-step timings so they can be exported
+        docling_settings.debug.profile_pipeline_timings = True
+
+    def get_converter(self, profile: str, do_ocr: bool = True) -> Tuple[DocumentConverter, str]:
+        """
+        Docling converter for a conversion profile, built on first use.
+
+        Args:
+            profile: Conversion profile
+            do_ocr: Run OCR; off for documents whose pre-scan found no scanned pages
+
+        Returns:
+            Tuple of (converter, options hash for the conversion cache)
+        """
+        key = (profile, do_ocr)
+        if key not in self._converters:
+            pipeline_options = build_pipeline_options(profile)
+            pipeline_options.do_ocr = do_ocr
+            # Newer Docling versions size their model thread pools from the pipeline options
+            if hasattr(pipeline_options, "accelerator_options"):
+                pipeline_options.accelerator_options.num_threads = threads_per_child()
+            converter = DocumentConverter(
+                format_options={
+                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+                }
+            )
+            self._converters[key] = (converter, options_hash(pipeline_options))
+        return self._converters[key]
 
     def process_pdf(
         self,
         pdf_path_or_url: str,
         category: str,
-        subcategory: Optional[str] = None
+        subcategory: Optional[str] = None,
+        conversion_profile: Optional[str] = None,
+        stats: Optional[dict] = None,
+        data: Optional[bytes] = None,
+        tenant: Optional[str] = None
     ) -> Tuple[List[str], List[dict], List[str]]:
         """
         Process a PDF document.
 
+        The conversion is taken from the Docling cache when the same file was
+        already converted with the same pipeline options. Otherwise the PDF is
+        pre-scanned first, and OCR is switched off unless a page needs it.
+
         Args:
             pdf_path_or_url: Path or URL to PDF
             category: Document category
             subcategory: Optional subcategory
+            conversion_profile: Pipeline profile; defaults to the category's or the global one
+            stats: Filled with the conversion decisions (profile, cache hit, OCR pages)
+            data: PDF contents, if already read
+            tenant: Application or team the document belongs to
 
         Returns:
             Tuple of (texts, metadatas, ids)
         """
-        logger.info(f"Converting PDF: {pdf_path_or_url}")
-        result = self.converter.convert(pdf_path_or_url)
+        filename = self._filename(pdf_path_or_url)
+        doc_id = self._document_id(pdf_path_or_url)
+        profile = resolve_profile(conversion_profile, category)
 
-        # Extract filename and document ID
-        if pdf_path_or_url.startswith(('http://', 'https://')):
-            filename = pdf_path_or_url.split('/')[-1]
+        if data is None:
+            data = read_pdf_source(pdf_path_or_url)
+        source_hash = file_hash(data)
+
+        do_ocr, prescan = True, None
+        if settings.PRESCAN_ENABLED:
+            try:
+                prescan = prescan_pdf(data)
+                do_ocr = prescan["needs_ocr"]
+            except Exception as e:
+                logger.warning(f"Pre-scan of {pdf_path_or_url} failed, converting with OCR: {str(e)}")
+        converter, opts_hash = self.get_converter(profile, do_ocr)
+
+        document = self.cache.get(source_hash, opts_hash) if settings.DOCLING_CACHE_ENABLED else None
+
+        cache_hit = False
+        if document is None:
+            logger.info(f"Converting PDF with the {profile} profile (OCR {'on' if do_ocr else 'off'}): {pdf_path_or_url}")
+            if pdf_path_or_url.startswith(('http://', 'https://')):
+                source = DocumentStream(name=filename, stream=BytesIO(data))
+            else:
+                source = pdf_path_or_url
+            page_batch_size = docling_settings.perf.page_batch_size
+            docling_settings.perf.page_batch_size = PROFILE_PAGE_BATCH_SIZES.get(profile, page_batch_size)
+            try:
+                with track_stage("docling_conversion"):
+                    result = converter.convert(source)
+            finally:
+                docling_settings.perf.page_batch_size = page_batch_size
+            observe_docling_timings(result)
+            PAGES_TOTAL.inc(len(result.document.pages))
+            document = result.document
+            if settings.DOCLING_CACHE_ENABLED:
+                self.cache.put(source_hash, opts_hash, document, doc_id, pdf_path_or_url)
         else:
-            filename = Path(pdf_path_or_url).name
+            logger.info(f"Using cached conversion of {pdf_path_or_url}")
+            cache_hit = True
+
+        if stats is not None:
+            stats.update(
+                conversion_profile=profile,
+                cache_hit=cache_hit,
+                ocr=do_ocr,
+                ocr_pages=prescan["ocr_pages"] if prescan else None,
+                page_decisions=prescan["pages"] if prescan else None,
+            )
+
+        return self.chunk_document(document, pdf_path_or_url, category, subcategory, profile, tenant)
+
+    def rechunk_document(
+        self,
+        document_id: str,
+        source_path: str,
+        category: str,
+        subcategory: Optional[str] = None,
+        conversion_profile: Optional[str] = None,
+        tenant: Optional[str] = None
+    ) -> Tuple[List[str], List[dict], List[str]]:
+        """
+        Chunk a document again from its cached conversion.
 
-        doc_id = hashlib.md5(pdf_path_or_url.encode()).hexdigest()[:8]
+        Falls back to converting the source when there is no cached
+        conversion made with the current pipeline options.
 
-        # Save images 
-        # save_image_ref(result, settings.OUTPUT_DIR, filename)
-        
+        Returns:
+            Tuple of (texts, metadatas, ids)
+        """
+        profile = resolve_profile(conversion_profile, category)
+        cached = self.cached_conversion(document_id, profile)
+        if cached is None:
+            logger.info(f"No cached conversion of {document_id}, converting {source_path}")
+            return self.process_pdf(source_path, category, subcategory, profile, tenant=tenant)
+
+        document, cached_source_path = cached
+        logger.info(f"Re-chunking {document_id} from its cached conversion")
+        return self.chunk_document(document, cached_source_path, category, subcategory, profile, tenant)
+
+    def cached_conversion(self, document_id: str, profile: str) -> Optional[Tuple[DoclingDocument, str]]:
+        """Cached conversion of a document made with the profile's current pipeline options, and its source path."""
+        if not settings.DOCLING_CACHE_ENABLED:
+            return None
+        # Either OCR variant of the profile is a current conversion
+        opts_hashes = [self.get_converter(profile, do_ocr)[1] for do_ocr in (True, False)]
+        return self.cache.get_for_document(document_id, opts_hashes)
+
+    def chunk_document(
+        self,
+        document: DoclingDocument,
+        pdf_path_or_url: str,
+        category: str,
+        subcategory: Optional[str] = None,
+        conversion_profile: str = "",
+        tenant: Optional[str] = None
+    ) -> Tuple[List[str], List[dict], List[str]]:
+        """
+        Chunk a converted document and build the chunk metadata.
+
+        Args:
+            document: Converted document
+            pdf_path_or_url: Path or URL the document was converted from
+            category: Document category
+            subcategory: Optional subcategory
+            conversion_profile: Profile the document was converted with
+            tenant: Application or team the document belongs to
+
+        Returns:
+            Tuple of (texts, metadatas, ids)
+        """
+        filename = self._filename(pdf_path_or_url)
+        doc_id = self._document_id(pdf_path_or_url)
 
         # Chunk the document
         chunker = HybridChunker(
@@ -97,15 +234,17 @@ class DocumentService:
             max_tokens=settings.CHUNKING_MAX_TOKENS,
             merge_peers=True,
         )
-        chunks = list(chunker.chunk(dl_doc=result.document))
+        with track_stage("chunking"):
+            chunks = list(chunker.chunk(dl_doc=document))
+        CHUNKS_TOTAL.labels(category=category).inc(len(chunks))
 
         # Count images and tables
         total_pictures = sum(
-            1 for element, _ in result.document.iterate_items()
+            1 for element, _ in document.iterate_items()
             if isinstance(element, PictureItem)
         )
         total_tables = sum(
-            1 for element, _ in result.document.iterate_items()
+            1 for element, _ in document.iterate_items()
             if isinstance(element, TableItem)
         )
 
@@ -117,12 +256,11 @@ class DocumentService:
         processed_texts = []
         metadatas = []
         ids = []
-        # picture_counter = 0
-        # table_counter = 0
+        image_store = ImageStore()
 
         for i, chunk in enumerate(chunks):
             text = chunk.text
-            image_info = get_image_info(result.document, chunk, Path(settings.OUTPUT_DIR / filename))
+            image_info = get_image_info(document, chunk, image_store)
             # image_info, picture_counter, table_counter = extract_image_info_from_chunk(result, chunk, filename, i, settings.OUTPUT_DIR, picture_counter, table_counter)
 
             # Extract page numbers
@@ -150,19 +288,49 @@ class DocumentService:
                 "document_id": doc_id,
                 "category": category,
                 "subcategory": subcategory or "",
+                "tenant": tenant or "",
                 "page_numbers": page_numbers_str,
                 "title": title,
                 "source_path": pdf_path_or_url,
-                "has_images": image_info["has_images"],
-                "image_count": image_info["image_count"],
-                "table_count": image_info["table_count"],
-                "image_references": image_info["image_references"],
-                "image_descriptions": image_info["image_descriptions"],
-                "figure_captions": image_info["figure_captions"],
+                "conversion_profile": conversion_profile,
+                **self._image_metadata(chunk, image_info),
             }
 
             processed_texts.append(text)
             metadatas.append(metadata)
             ids.append(f"{doc_id}-chunk-{i}")
 
+        # Neighbours and figure/table links, for expanding search hits
+        for metadata, adjacency in zip(metadatas, adjacency_metadata(ids, chunk_links(document, chunks))):
+            metadata.update(adjacency)
+
         return processed_texts, metadatas, ids
+
+    @staticmethod
+    def _image_metadata(chunk, image_info: dict) -> dict:
+        """Flatten ``get_image_info`` output into the chunk metadata fields."""
+        figures = image_info["figures"]
+        descriptions = [
+            annotation.text
+            for item in chunk.meta.doc_items if isinstance(item, PictureItem)
+            for annotation in item.annotations if getattr(annotation, "kind", None) == "description"
+        ]
+        return {
+            "has_images": image_info["has_images"],
+            "image_count": len(figures),
+            "table_count": sum(1 for item in chunk.meta.doc_items if isinstance(item, TableItem)),
+            "image_references": ",".join(f["image_url"] for f in figures),
+            "image_hashes": ",".join(f["image_hash"] for f in figures),
+            "image_descriptions": " | ".join(descriptions),
+            "figure_captions": " | ".join(f["caption"] for f in figures if f["caption"] != "No caption"),
+        }
+
+    @staticmethod
+    def _filename(pdf_path_or_url: str) -> str:
+        if pdf_path_or_url.startswith(('http://', 'https://')):
+            return pdf_path_or_url.split('/')[-1]
+        return Path(pdf_path_or_url).name
+
+    @staticmethod
+    def _document_id(pdf_path_or_url: str) -> str:
+        return hashlib.md5(pdf_path_or_url.encode()).hexdigest()[:8]
@@ -3,9 +3,13 @@ OpenAI embedding service.
 """
 import logging
 from typing import List
+import openai
+import tiktoken
 from openai import OpenAI
 
 from app.core.config import settings
+from app.core.metrics import track_stage, TOKENS_TOTAL
+from app.services.openai_governor import BULK, get_openai_governor, retry_after_seconds
 
 logger = logging.getLogger(__name__)
 
@@ -14,17 +18,51 @@ class EmbeddingService:
     """Service for generating embeddings."""
 
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # The governor does the retrying, so every attempt is budgeted
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
         self.model = settings.OPENAI_EMBEDDING_MODEL
+        self.governor = get_openai_governor()
+        try:
+            self.encoding = tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
 
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts."""
+    def count_tokens(self, texts: List[str]) -> int:
+        """Tokens an embedding request for ``texts`` will use."""
+        return sum(len(self.encoding.encode(text, disallowed_special=())) for text in texts)
+
+    def get_embeddings(self, texts: List[str], priority: str = BULK) -> List[List[float]]:
+        """
+        Generate embeddings for a list of texts.
+
+        Args:
+            texts: Texts to embed
+            priority: ``interactive`` for user-facing calls (search), ``bulk`` for ingestion
+
+        Returns:
+            List[List[float]]: One embedding per text
+        """
         logger.info(f"Generating embeddings for {len(texts)} texts")
+        tokens = self.count_tokens(texts)
+
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            self.governor.acquire(self.model, tokens, priority=priority)
+            try:
+                with track_stage("embedding_batch"):
+                    response = self.client.embeddings.create(
+                        model=self.model,
+                        input=texts,
+                    )
+                break
+            except openai.RateLimitError as e:
+                if attempt == settings.OPENAI_MAX_RETRIES:
+                    raise
+                self.governor.rate_limited(self.model, retry_after_seconds(e.response.headers))
 
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=texts,
-        )
+        if response.usage:
+            TOKENS_TOTAL.labels(model=self.model, purpose="embedding").inc(
+                response.usage.total_tokens
+            )
 
         embeddings = [d.embedding for d in response.data]
         logger.info(f"Generated {len(embeddings)} embeddings")
@@ -0,0 +1,116 @@
+"""
+Content-addressed store for extracted figures.
+
+Each figure is stored once, named by the SHA-256 of its PNG bytes, so the
+same picture appearing in several chunks, documents or re-chunks of a
+document is written once. A compressed WebP thumbnail is generated for each
+figure after processing (``generate_thumbnails_task``), or on first request
+if that has not happened yet.
+
+Because the name is the content hash, an image URL never changes content,
+and the API serves both variants with immutable cache headers.
+
+Layout::
+
+    originals/<hash[:2]>/<hash>.png
+    thumbnails/<hash[:2]>/<hash>.webp
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = ("thumbnail", "original")
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def image_url(image_hash: str, variant: str = "thumbnail") -> str:
+    """API URL of a stored image."""
+    url = f"{settings.API_V1_PREFIX}/images/{image_hash}"
+    return f"{url}/thumbnail" if variant == "thumbnail" else url
+
+
+class ImageStore:
+    """Stores figures by content hash and serves their paths."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.IMAGE_STORE_DIR)
+
+    @staticmethod
+    def validate_hash(image_hash: str) -> str:
+        """
+        Check that a hash can name a stored image (and cannot escape the store).
+
+        Raises:
+            ValueError: If the hash is not a lowercase SHA-256 hex digest
+        """
+        if not _HASH_PATTERN.match(image_hash):
+            raise ValueError(f"Invalid image hash {image_hash!r}")
+        return image_hash
+
+    def original_path(self, image_hash: str) -> Path:
+        return self.root / "originals" / image_hash[:2] / f"{image_hash}.png"
+
+    def thumbnail_path(self, image_hash: str) -> Path:
+        return self.root / "thumbnails" / image_hash[:2] / f"{image_hash}.webp"
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        """Write atomically, so a reader never sees a partial image."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def put(self, image) -> str:
+        """
+        Store a PIL image as PNG unless an identical one is already stored.
+
+        Returns:
+            str: The image's content hash
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        data = buffer.getvalue()
+        image_hash = hashlib.sha256(data).hexdigest()
+
+        path = self.original_path(image_hash)
+        if not path.exists():
+            self._write(path, data)
+        return image_hash
+
+    def ensure_thumbnail(self, image_hash: str) -> Path:
+        """
+        Path of an image's WebP thumbnail, generating it if missing.
+
+        Raises:
+            FileNotFoundError: If the image is not stored
+        """
+        path = self.thumbnail_path(image_hash)
+        if path.exists():
+            return path
+
+        from PIL import Image
+
+        with Image.open(self.original_path(image_hash)) as image:
+            image.thumbnail((settings.IMAGE_THUMBNAIL_SIZE, settings.IMAGE_THUMBNAIL_SIZE))
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP", quality=settings.IMAGE_THUMBNAIL_QUALITY, method=6)
+        self._write(path, buffer.getvalue())
+        return path
@@ -0,0 +1,185 @@
+"""
+Memory admission control for PDF processing on a worker node.
+
+Every processing task estimates its peak memory from page count, file size
+and conversion profile, and reserves it in a ledger shared by all worker
+processes on the node (a SQLite file, like the OpenAI governor). A task
+whose reservation does not fit is put back on its queue for later instead
+of pushing the node into the OOM killer.
+
+A reservation left behind by a process that no longer exists means the
+worker died mid-task, usually OOM-killed. Those deaths are counted per file;
+a file that keeps killing workers is converted with the ``low_memory``
+profile from then on.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import psutil
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Relative peak memory per page of each conversion profile
+PROFILE_MEMORY_FACTORS = {
+    "fast": 0.5,
+    "standard": 1.0,
+    "full": 2.0,
+    "low_memory": 0.3,
+}
+
+
+def estimate_task_memory(pages: int, file_size: int, profile: str) -> int:
+    """Predicted peak RSS in MB of converting a PDF."""
+    factor = PROFILE_MEMORY_FACTORS.get(profile, 1.0)
+    return int(
+        settings.MEMORY_BASE_MB
+        + pages * settings.MEMORY_PER_PAGE_MB * factor
+        + file_size / MB * settings.MEMORY_PER_FILE_MB
+    )
+
+
+def memory_budget_mb() -> int:
+    """Memory processing tasks on this node may reserve in total."""
+    if settings.MEMORY_BUDGET_MB:
+        return settings.MEMORY_BUDGET_MB
+    return int(psutil.virtual_memory().total / MB * settings.MEMORY_BUDGET_FRACTION)
+
+
+class MemoryGovernor:
+    """Node-wide reservation ledger."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.MEMORY_GOVERNOR_PATH
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reservations (
+                task_id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                file_key TEXT NOT NULL,
+                mb INTEGER NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crashes (
+                file_key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                updated REAL NOT NULL
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _reap(self, conn: sqlite3.Connection):
+        """Drop reservations of dead processes, counting a crash for their file."""
+        for task_id, pid, file_key in conn.execute("SELECT task_id, pid, file_key FROM reservations").fetchall():
+            if psutil.pid_exists(pid):
+                continue
+            logger.warning(f"Worker {pid} died while processing task {task_id}; counting a crash for its file")
+            conn.execute("DELETE FROM reservations WHERE task_id=?", (task_id,))
+            conn.execute(
+                """
+                INSERT INTO crashes (file_key, count, updated) VALUES (?, 1, ?)
+                ON CONFLICT (file_key) DO UPDATE SET count=count+1, updated=excluded.updated
+                """,
+                (file_key, time.time()),
+            )
+
+    def try_reserve(self, task_id: str, file_key: str, mb: int) -> bool:
+        """
+        Reserve ``mb`` for a task if it fits the budget and free memory.
+
+        A task is always admitted when nothing else is reserved, so a file
+        larger than the budget still runs (alone).
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reap(conn)
+            conn.execute("DELETE FROM reservations WHERE task_id=?", (task_id,))
+            reserved = conn.execute("SELECT COALESCE(SUM(mb), 0) FROM reservations").fetchone()[0]
+            available = psutil.virtual_memory().available / MB
+            admitted = reserved == 0 or (
+                reserved + mb <= memory_budget_mb() and mb <= available - settings.MEMORY_MIN_FREE_MB
+            )
+            if admitted:
+                conn.execute(
+                    "INSERT INTO reservations (task_id, pid, file_key, mb, created) VALUES (?, ?, ?, ?, ?)",
+                    (task_id, os.getpid(), file_key, mb, time.time()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not admitted:
+            logger.info(f"Deferring task {task_id}: needs {mb} MB, {reserved} MB reserved, {available:.0f} MB available")
+        return admitted
+
+    def release(self, task_id: str, file_key: Optional[str] = None):
+        """Drop a task's reservation; with ``file_key``, the file also converted fine, so forget its crashes."""
+        conn = self._conn()
+        conn.execute("DELETE FROM reservations WHERE task_id=?", (task_id,))
+        if file_key:
+            conn.execute("DELETE FROM crashes WHERE file_key=?", (file_key,))
+
+    def crash_count(self, file_key: str) -> int:
+        """How often a worker died processing this file."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reap(conn)
+            row = conn.execute("SELECT count FROM crashes WHERE file_key=?", (file_key,)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row[0] if row else 0
+
+
+@lru_cache()
+def get_memory_governor() -> MemoryGovernor:
+    """Shared memory governor for the process."""
+    return MemoryGovernor()
+
+
+@contextmanager
+def track_peak_rss(interval: Optional[float] = None):
+    """
+    Sample this process's RSS in the background while the block runs.
+
+    Yields a dict whose ``peak_mb`` holds the highest RSS seen so far.
+    """
+    interval = interval or settings.MEMORY_SAMPLE_INTERVAL
+    process = psutil.Process()
+    result = {"peak_mb": process.memory_info().rss / MB}
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            result["peak_mb"] = max(result["peak_mb"], process.memory_info().rss / MB)
+
+    thread = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    thread.start()
+    try:
+        yield result
+    finally:
+        stop.set()
+        thread.join()
+        result["peak_mb"] = max(result["peak_mb"], process.memory_info().rss / MB)
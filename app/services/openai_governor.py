@@ -0,0 +1,220 @@
+"""
+Cluster-wide OpenAI request and token budgets.
+
+Every API/worker process asks the governor before calling OpenAI. Budgets are
+token buckets per model (requests per minute and tokens per minute) kept in
+a shared backend, so all processes draw from the same allowance:
+
+- ``sqlite``: a database file with ``BEGIN IMMEDIATE`` transactions; shared by
+  every process on one node (or on nodes sharing the file over a filesystem
+  with working locks)
+- ``none``: no coordination
+
+Other stores (e.g. Redis for several nodes) plug in by implementing
+``GovernorBackend`` and registering it in ``GOVERNOR_BACKENDS``.
+
+Interactive calls (search) may use the whole bucket. Bulk calls (ingestion)
+stop at ``OPENAI_INTERACTIVE_RESERVE`` of capacity, leaving headroom for
+searches. A 429 pauses the model's buckets for every process.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import GOVERNOR_WAIT_SECONDS, OPENAI_RATE_LIMITED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+
+class GovernorBackend:
+    """Shared bucket store. Implementations must make ``try_acquire`` atomic across processes."""
+
+    def try_acquire(self, buckets: List[Tuple[str, float, float]], reserve: float) -> float:
+        """
+        Take ``amount`` from every ``(key, capacity, amount)`` bucket, or from none.
+
+        Buckets refill at ``capacity`` per minute. A bucket may not drop below
+        ``reserve`` (a fraction of capacity).
+
+        Returns:
+            float: 0 if granted, else seconds to wait before trying again
+        """
+        raise NotImplementedError
+
+    def pause(self, keys: List[str], seconds: float):
+        """Block the buckets for ``seconds`` (after a 429)."""
+        raise NotImplementedError
+
+
+class NullGovernorBackend(GovernorBackend):
+    """Always grants; for single-process development."""
+
+    def try_acquire(self, buckets, reserve):
+        return 0.0
+
+    def pause(self, keys, seconds):
+        pass
+
+
+class SQLiteGovernorBackend(GovernorBackend):
+    """Buckets in a SQLite file, coordinated by SQLite's write lock."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.OPENAI_GOVERNOR_PATH
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                level REAL NOT NULL,
+                updated REAL NOT NULL,
+                paused_until REAL NOT NULL DEFAULT 0
+            )
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit mode so BEGIN IMMEDIATE is explicit
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self, buckets, reserve):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            wait, levels = 0.0, {}
+            for key, capacity, amount in buckets:
+                row = conn.execute(
+                    "SELECT level, updated, paused_until FROM buckets WHERE key=?", (key,)
+                ).fetchone()
+                level, paused_until = capacity, 0.0
+                if row:
+                    level = min(capacity, row[0] + (now - row[1]) * capacity / 60)
+                    paused_until = row[2]
+                levels[key] = level
+
+                floor = capacity * reserve
+                # A request bigger than the usable bucket could never fit; let it through when full
+                amount = min(amount, capacity - floor)
+                if paused_until > now:
+                    wait = max(wait, paused_until - now)
+                elif level - amount < floor:
+                    wait = max(wait, (floor + amount - level) * 60 / capacity)
+
+            if wait == 0:
+                conn.executemany(
+                    """
+                    INSERT INTO buckets (key, level, updated) VALUES (?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET level=excluded.level, updated=excluded.updated
+                    """,
+                    [(key, levels[key] - min(amount, capacity * (1 - reserve)), now)
+                     for key, capacity, amount in buckets],
+                )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def pause(self, keys, seconds):
+        conn = self._conn()
+        until = time.time() + seconds
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key in keys:
+                # Empty the bucket too, so requests resume gradually after the pause
+                conn.execute(
+                    """
+                    INSERT INTO buckets (key, level, updated, paused_until) VALUES (?, 0, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET level=0, updated=excluded.updated,
+                        paused_until=MAX(paused_until, excluded.paused_until)
+                    """,
+                    (key, until, until),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+GOVERNOR_BACKENDS = {
+    "sqlite": SQLiteGovernorBackend,
+    "none": NullGovernorBackend,
+}
+
+
+class OpenAIGovernor:
+    """Blocks callers until their request fits the model's shared budgets."""
+
+    def __init__(self, backend: Optional[GovernorBackend] = None):
+        self.backend = backend or GOVERNOR_BACKENDS[settings.OPENAI_GOVERNOR_BACKEND]()
+
+    @staticmethod
+    def limits_for(model: str) -> Dict[str, int]:
+        """Requests/tokens per minute for a model."""
+        if model == settings.OPENAI_EMBEDDING_MODEL:
+            return {"rpm": settings.OPENAI_EMBEDDING_RPM, "tpm": settings.OPENAI_EMBEDDING_TPM}
+        return {"rpm": settings.OPENAI_CHAT_RPM, "tpm": settings.OPENAI_CHAT_TPM}
+
+    def acquire(self, model: str, tokens: int, priority: str = BULK):
+        """
+        Wait until one request of ``tokens`` tokens fits the budgets.
+
+        Raises:
+            TimeoutError: If the budget does not free up within OPENAI_GOVERNOR_MAX_WAIT
+        """
+        limits = self.limits_for(model)
+        buckets = [(f"{model}:rpm", limits["rpm"], 1), (f"{model}:tpm", limits["tpm"], tokens)]
+        reserve = 0.0 if priority == INTERACTIVE else settings.OPENAI_INTERACTIVE_RESERVE
+
+        start = time.monotonic()
+        while True:
+            wait = self.backend.try_acquire(buckets, reserve)
+            if wait == 0:
+                break
+            waited = time.monotonic() - start
+            if waited + wait > settings.OPENAI_GOVERNOR_MAX_WAIT:
+                raise TimeoutError(f"OpenAI budget for {model} not available within {settings.OPENAI_GOVERNOR_MAX_WAIT}s")
+            time.sleep(min(wait, 5.0))
+        GOVERNOR_WAIT_SECONDS.labels(model=model, priority=priority).observe(time.monotonic() - start)
+
+    def rate_limited(self, model: str, retry_after: Optional[float] = None):
+        """Record a 429: pause the model's buckets for everyone."""
+        seconds = retry_after if retry_after is not None else settings.OPENAI_RATE_LIMIT_PAUSE
+        OPENAI_RATE_LIMITED_TOTAL.labels(model=model).inc()
+        logger.warning(f"OpenAI rate limited {model}, pausing all callers for {seconds:.1f}s")
+        self.backend.pause([f"{model}:rpm", f"{model}:tpm"], seconds)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Retry-After (or OpenAI's retry-after-ms) from response headers, if present."""
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+@lru_cache()
+def get_openai_governor() -> OpenAIGovernor:
+    """Shared governor for the process."""
+    return OpenAIGovernor()
+
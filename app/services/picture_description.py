@@ -0,0 +1,69 @@
+"""
+Docling picture descriptions through the OpenAI governor.
+
+Docling calls the OpenAI API itself to describe pictures. These calls are
+governed by a picture-description model of our own, registered with
+Docling's picture-description factory (the extension point Docling uses for
+its own and plugin models) and selected by its options type: pipelines built
+with ``governed_picture_description_options`` use it.
+"""
+from typing import ClassVar, Iterable, Literal
+
+from docling.datamodel.pipeline_options import PictureDescriptionApiOptions
+from docling.models.factories import get_picture_description_factory
+from docling.models.picture_description_api_model import PictureDescriptionApiModel
+from PIL import Image
+
+from app.core.config import settings
+from app.services.openai_governor import BULK, get_openai_governor, retry_after_seconds
+
+
+class GovernedPictureDescriptionApiOptions(PictureDescriptionApiOptions):
+    """Options of Docling's API picture description, selecting the governed model."""
+
+    kind: ClassVar[Literal["openai_governed"]] = "openai_governed"
+
+
+class GovernedPictureDescriptionApiModel(PictureDescriptionApiModel):
+    """
+    Docling's API picture description, one governed request per picture.
+
+    Each picture waits for the bulk OpenAI budget; a 429 pauses the model's
+    buckets for every process and the picture is retried.
+    """
+
+    @classmethod
+    def get_options_type(cls):
+        return GovernedPictureDescriptionApiOptions
+
+    def _annotate_images(self, images: Iterable[Image.Image]) -> Iterable[str]:
+        for image in images:
+            yield self._describe(image)
+
+    def _describe(self, image: Image.Image) -> str:
+        governor = get_openai_governor()
+        model = self.options.params.get("model", settings.OPENAI_MODEL)
+        tokens = settings.OPENAI_IMAGE_TOKEN_ESTIMATE + len(self.options.prompt) // 4
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            governor.acquire(model, tokens, priority=BULK)
+            try:
+                return next(iter(super()._annotate_images([image])))
+            except Exception as e:
+                response = getattr(e, "response", None)
+                if getattr(response, "status_code", None) != 429 or attempt == settings.OPENAI_MAX_RETRIES:
+                    raise
+                governor.rate_limited(model, retry_after_seconds(response.headers))
+
+
+def register_governed_picture_description():
+    """Register the governed model with Docling's picture-description factories."""
+    for allow_external_plugins in (False, True):
+        factory = get_picture_description_factory(allow_external_plugins=allow_external_plugins)
+        if GovernedPictureDescriptionApiOptions not in factory.classes:
+            factory.register(GovernedPictureDescriptionApiModel, "docling-rag", __name__)
+
+
+def governed_picture_description_options(**kwargs) -> GovernedPictureDescriptionApiOptions:
+    """Picture-description options for OpenAI, described by the governed model."""
+    register_governed_picture_description()
+    return GovernedPictureDescriptionApiOptions(**kwargs)
@@ -0,0 +1,363 @@
+"""
+Zero-downtime reindexing into a shadow collection.
+
+A reindex rebuilds every document into a new collection while searches keep
+using the live one, then switches the collection alias atomically:
+
+- ``reembed``: copy stored chunk texts and metadata, with fresh embeddings
+  (e.g. after changing ``OPENAI_EMBEDDING_MODEL``)
+- ``reprocess``: chunk every PDF again (e.g. after changing
+  ``CHUNKING_MAX_TOKENS``), starting from its cached Docling conversion and
+  converting only PDFs without a current one; chunks without a PDF source,
+  such as Confluence pages, are re-embedded instead
+
+Sharded collections (``CHROMA_SHARD_BY``) are rebuilt as a whole: every
+shard of the live collection is read, and chunks are written to the shards of
+the shadow collection, which become live with the same switch.
+
+Progress is kept in a state file next to the alias, so an interrupted
+reindex resumes where it stopped instead of starting over.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import (
+    EXTERNAL_SOURCE_KEY,
+    get_collection,
+    get_live_collection_name,
+    get_shard_names,
+    set_live_collection_name,
+    shard_collection_name,
+    shard_key,
+)
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "reindex_state.json"
+REINDEX_MODES = ("reembed", "reprocess")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _state_path() -> Path:
+    return Path(settings.CHROMA_PERSIST_DIR) / STATE_FILE
+
+
+def read_reindex_state() -> Optional[dict]:
+    """Current (or last) reindex state, if any reindex was ever started."""
+    path = _state_path()
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_reindex_state(state: dict):
+    """Persist state atomically so readers never see a half-written file."""
+    path = _state_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{STATE_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def is_reindex_active(state: Optional[dict]) -> bool:
+    """True while a reindex is queued or running with a recent heartbeat."""
+    if not state or state["status"] not in ACTIVE_STATUSES:
+        return False
+    return time.time() - state["heartbeat"] < settings.REINDEX_STALE_AFTER
+
+
+def get_shadow_collection_name() -> Optional[str]:
+    """Collection being built by an active reindex; writes that remove data must apply to it too."""
+    state = read_reindex_state()
+    return state["target"] if is_reindex_active(state) else None
+
+
+def start_reindex(mode: str, resume: bool = True) -> dict:
+    """
+    Create (or pick up) the reindex state for a new task.
+
+    An unfinished reindex with the same mode is resumed when ``resume`` is set,
+    keeping its shadow collection and progress.
+
+    Raises:
+        ValueError: If the mode is unknown or a reindex is already running
+    """
+    if mode not in REINDEX_MODES:
+        raise ValueError(f"Unknown reindex mode {mode!r}, expected one of {REINDEX_MODES}")
+
+    state = read_reindex_state()
+    if is_reindex_active(state):
+        raise ValueError(f"Reindex {state['reindex_id']} is already {state['status']}")
+
+    now = time.time()
+    if resume and state and state["status"] != "completed" and state["mode"] == mode:
+        state.update(status="queued", error=None, heartbeat=now)
+        logger.info(f"Resuming reindex {state['reindex_id']} into {state['target']}")
+    else:
+        reindex_id = uuid.uuid4().hex
+        source = get_live_collection_name()
+        state = {
+            "reindex_id": reindex_id,
+            "mode": mode,
+            "status": "queued",
+            "phase": "copy",
+            "source": source,
+            "target": f"{settings.CHROMA_COLLECTION_NAME}_{time.strftime('%Y%m%d%H%M%S')}",
+            "offsets": {},
+            "pending_docs": {},
+            "done_docs": [],
+            "failed_docs": [],
+            "copied": 0,
+            "reprocessed": 0,
+            "started_at": now,
+            "heartbeat": now,
+            "finished_at": None,
+            "error": None,
+        }
+    write_reindex_state(state)
+    return state
+
+
+class ReindexService:
+    """Builds the shadow collection for a reindex started with ``start_reindex``."""
+
+    def __init__(self):
+        from app.services.chroma_writer import get_chroma_writer
+        from app.services.embedding_service import EmbeddingService
+        self.embedding_service = EmbeddingService()
+        self.writer = get_chroma_writer()
+
+    def run(self, reindex_id: str, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Run (or resume) a reindex to completion.
+
+        Args:
+            reindex_id: ID returned by ``start_reindex``
+            progress: Called with the state after every batch
+
+        Returns:
+            dict: The final state
+        """
+        state = read_reindex_state()
+        if not state or state["reindex_id"] != reindex_id:
+            raise ValueError(f"Reindex {reindex_id} is not the current reindex")
+
+        self.state = state
+        self.progress = progress
+        self._save(status="running")
+
+        try:
+            if state["phase"] == "copy":
+                self._copy_chunks()
+                self._save(phase="reprocess")
+            if state["phase"] == "reprocess":
+                self._reprocess_documents()
+                self._save(phase="catch_up")
+
+            # Writes that landed in the live collection meanwhile, until nothing changes
+            for _ in range(settings.REINDEX_CATCH_UP_ROUNDS):
+                if not self._catch_up():
+                    break
+
+            set_live_collection_name(state["target"], previous=state["source"])
+            logger.info(f"Switched live collection {state['source']} -> {state['target']}")
+            # Writers that resolved the old collection just before the switch
+            self._catch_up()
+            self._save(status="completed", phase="done", finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Reindex {reindex_id} failed: {str(e)}", exc_info=True)
+            self._save(status="failed", error=str(e))
+            raise
+
+        return self.state
+
+    def _save(self, **fields):
+        self.state.update(fields, heartbeat=time.time())
+        write_reindex_state(self.state)
+        if self.progress:
+            self.progress(self.state)
+
+    def _reprocessable(self, metadata: Dict) -> bool:
+        return (
+            self.state["mode"] == "reprocess"
+            and EXTERNAL_SOURCE_KEY not in metadata
+            and bool(metadata.get("source_path"))
+        )
+
+    def _sources(self) -> list:
+        """The live collection being rebuilt and its shards."""
+        return [get_collection(name) for name in get_shard_names(self.state["source"])]
+
+    def _target_name(self, metadata: Dict) -> str:
+        """Shadow collection (shard) a chunk belongs in."""
+        return shard_collection_name(shard_key(metadata), base=self.state["target"])
+
+    def _copy_chunks(self):
+        """Page through the live collections; copy chunks, note PDFs to reprocess."""
+        batch_size = settings.REINDEX_BATCH_SIZE
+        # States written before sharding kept one offset
+        offsets = self.state.setdefault("offsets", {self.state["source"]: self.state.pop("offset", 0)})
+        for source in self._sources():
+            while True:
+                page = source.get(
+                    limit=batch_size,
+                    offset=offsets.get(source.name, 0),
+                    include=["documents", "metadatas"],
+                )
+                if not page["ids"]:
+                    break
+
+                copy = []
+                for chunk_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    if self._reprocessable(metadata):
+                        self.state["pending_docs"][metadata["document_id"]] = {
+                            "source_path": metadata["source_path"],
+                            "category": metadata.get("category", ""),
+                            "subcategory": metadata.get("subcategory") or None,
+                            "conversion_profile": metadata.get("conversion_profile") or None,
+                            "tenant": metadata.get("tenant") or None,
+                        }
+                    elif text is not None:
+                        copy.append((chunk_id, text, metadata))
+                self._upsert(copy, skip_existing=True)
+
+                offsets[source.name] = offsets.get(source.name, 0) + len(page["ids"])
+                self._save(copied=self.state["copied"] + len(copy))
+                time.sleep(settings.REINDEX_THROTTLE_SECONDS)
+
+    def _reprocess_documents(self):
+        """Chunk every pending PDF again; one document at a time, checkpointed."""
+        done = set(self.state["done_docs"])
+        todo = [(doc_id, doc) for doc_id, doc in self.state["pending_docs"].items() if doc_id not in done]
+        if not todo:
+            return
+
+        from app.services.document_service import DocumentService
+
+        doc_service = DocumentService()
+        for document_id, doc in todo:
+            try:
+                texts, metadatas, ids = doc_service.rechunk_document(
+                    document_id, doc["source_path"], doc["category"], doc["subcategory"],
+                    doc.get("conversion_profile"), doc.get("tenant")
+                )
+                self._upsert(list(zip(ids, texts, metadatas)))
+                self.state["reprocessed"] += 1
+            except Exception as e:
+                # Keep the document searchable with its existing chunks, re-embedded
+                logger.warning(f"Reprocessing {document_id} failed, copying its chunks instead: {str(e)}")
+                for source in self._sources():
+                    chunks = source.get(where={"document_id": document_id}, include=["documents", "metadatas"])
+                    self._upsert(list(zip(chunks["ids"], chunks["documents"], chunks["metadatas"])))
+                self.state["failed_docs"].append(document_id)
+            self.state["done_docs"].append(document_id)
+            self._save()
+            time.sleep(settings.REINDEX_THROTTLE_SECONDS)
+
+    def _catch_up(self) -> int:
+        """
+        Bring the shadow collections in line with the live ones.
+
+        Reprocessed PDFs are compared by document (their chunk IDs may differ),
+        everything else chunk by chunk. Returns the number of changes made.
+        """
+        source = self._metadata_index(self._sources())
+        target = self._metadata_index(
+            [get_collection(name) for name in get_shard_names(self.state["target"])]
+        )
+        reprocessed = set(self.state["done_docs"])
+
+        source_docs = {m["document_id"]: m for _, m in source.values() if self._reprocessable(m)}
+        new_docs = {doc_id: m for doc_id, m in source_docs.items() if doc_id not in reprocessed}
+        gone_docs = [doc_id for doc_id in reprocessed if doc_id not in source_docs]
+        # Chunks that moved to another shard are deleted and copied again
+        new_ids = [
+            chunk_id for chunk_id, (_, m) in source.items()
+            if not self._reprocessable(m)
+            and (chunk_id not in target or target[chunk_id][0] != self._target_name(m))
+        ]
+        gone_ids = [
+            chunk_id for chunk_id, (name, m) in target.items()
+            if m.get("document_id") not in reprocessed
+            and (chunk_id not in source or name != self._target_name(source[chunk_id][1]))
+        ]
+
+        for document_id in gone_docs:
+            for name in get_shard_names(self.state["target"]):
+                self.writer.delete(where={"document_id": document_id}, collection_name=name)
+            self.state["done_docs"].remove(document_id)
+        for name, ids in self._by_collection(gone_ids, target).items():
+            for i in range(0, len(ids), settings.REINDEX_BATCH_SIZE):
+                self.writer.delete(ids=ids[i:i + settings.REINDEX_BATCH_SIZE], collection_name=name)
+        for name, ids in self._by_collection(new_ids, source).items():
+            for i in range(0, len(ids), settings.REINDEX_BATCH_SIZE):
+                chunks = get_collection(name).get(ids=ids[i:i + settings.REINDEX_BATCH_SIZE], include=["documents", "metadatas"])
+                self._upsert(list(zip(chunks["ids"], chunks["documents"], chunks["metadatas"])))
+        for document_id, m in new_docs.items():
+            self.state["pending_docs"][document_id] = {
+                "source_path": m["source_path"],
+                "category": m.get("category", ""),
+                "subcategory": m.get("subcategory") or None,
+                "conversion_profile": m.get("conversion_profile") or None,
+                "tenant": m.get("tenant") or None,
+            }
+        if new_docs:
+            self._reprocess_documents()
+
+        changes = len(gone_docs) + len(gone_ids) + len(new_ids) + len(new_docs)
+        logger.info(f"Reindex catch-up applied {changes} changes")
+        self._save()
+        return changes
+
+    @staticmethod
+    def _metadata_index(collections: list) -> Dict[str, Tuple[str, Dict]]:
+        """{chunk_id: (collection name, metadata)} for whole collections, read in pages."""
+        index = {}
+        for collection in collections:
+            offset = 0
+            while True:
+                page = collection.get(limit=settings.REINDEX_BATCH_SIZE * 10, offset=offset, include=["metadatas"])
+                if not page["ids"]:
+                    break
+                index.update((chunk_id, (collection.name, m)) for chunk_id, m in zip(page["ids"], page["metadatas"]))
+                offset += len(page["ids"])
+        return index
+
+    @staticmethod
+    def _by_collection(chunk_ids: List[str], index: Dict[str, Tuple[str, Dict]]) -> Dict[str, List[str]]:
+        """Group chunk IDs by the collection ``index`` has them in."""
+        groups = defaultdict(list)
+        for chunk_id in chunk_ids:
+            if chunk_id in index:
+                groups[index[chunk_id][0]].append(chunk_id)
+        return groups
+
+    def _upsert(self, chunks: List[tuple], skip_existing: bool = False):
+        """Embed (id, text, metadata) chunks in batches and upsert them into their shadow collections."""
+        chunks = [c for c in chunks if c[1] is not None]
+        shards = defaultdict(list)
+        for chunk in chunks:
+            shards[self._target_name(chunk[2])].append(chunk)
+
+        batch_size = settings.REINDEX_BATCH_SIZE
+        for collection_name, shard_chunks in shards.items():
+            if skip_existing:
+                existing = set(get_collection(collection_name).get(ids=[c[0] for c in shard_chunks], include=[])["ids"])
+                shard_chunks = [c for c in shard_chunks if c[0] not in existing]
+
+            for i in range(0, len(shard_chunks), batch_size):
+                batch = shard_chunks[i:i + batch_size]
+                self.writer.upsert(
+                    ids=[c[0] for c in batch],
+                    documents=[c[1] for c in batch],
+                    metadatas=[c[2] for c in batch],
+                    embeddings=self.embedding_service.get_embeddings([c[1] for c in batch]),
+                    collection_name=collection_name,
+                )
@@ -1,40 +1,106 @@
 """
 Vector database service for ChromaDB operations.
+
+With ``CHROMA_SHARD_BY`` set, every chunk is written to the collection of its
+shard, and a search queries the shards it can match concurrently and merges
+their top results by distance.
 """
+import heapq
 import logging
-from typing import List, Optional, Dict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import List, Optional, Dict, Sequence
 
-from app.core.database import get_chroma_client, get_collection
+from app.core.config import settings
+from app.core.database import (
+    get_chroma_client,
+    get_collection,
+    get_shard_names,
+    shard_collection_name,
+    shard_key,
+)
+from app.core.metrics import track_stage
+from app.services.chroma_writer import get_chroma_writer
 from app.services.embedding_service import EmbeddingService
+from app.services.openai_governor import INTERACTIVE
+from app.services.reindex_service import get_shadow_collection_name
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache()
+def _search_pool() -> ThreadPoolExecutor:
+    """Threads for querying shards concurrently (Chroma releases the GIL in its index)."""
+    return ThreadPoolExecutor(max_workers=settings.CHROMA_SEARCH_WORKERS, thread_name_prefix="shard-search")
+
+
 class VectorDBService:
     """Service for vector database operations."""
 
     def __init__(self):
         self.embedding_service = EmbeddingService()
+        self.writer = get_chroma_writer()
         self.client = get_chroma_client()
-        self.collection = get_collection()
-    
+
+    @property
+    def collection(self):
+        """The live collection, re-resolved so a reindex alias switch is picked up."""
+        return get_collection()
+
+    def collections(self, shard: Optional[str] = None) -> list:
+        """
+        Live collections a read has to cover.
+
+        Only existing shards are returned, so reads never create collections.
+        The live collection is always included: it holds chunks without a
+        shard key, chunks from external indexers and chunks stored before
+        sharding was enabled.
+
+        Args:
+            shard: Value of the ``CHROMA_SHARD_BY`` field the read is limited to, if any
+        """
+        names = get_shard_names()
+        if settings.CHROMA_SHARD_BY and shard:
+            shard_name = shard_collection_name(shard)
+            names = [names[0]] + [name for name in names[1:] if name == shard_name]
+        return [get_collection(name) for name in names]
+
+    def find_document(self, document_id: str, include: Optional[List[str]] = None) -> Dict[str, dict]:
+        """A document's chunks per collection: {collection name: Chroma get result}."""
+        found = {}
+        for collection in self.collections():
+            chunks = collection.get(where={"document_id": document_id}, include=include or [])
+            if chunks["ids"]:
+                found[collection.name] = chunks
+        return found
+
     def add_documents(
         self,
         texts: List[str],
         metadatas: List[dict],
         ids: List[str]
     ):
-        """Add documents to the vector database."""
+        """Add documents to the vector database, each to the collection of its shard."""
         logger.info(f"Computing embeddings for {len(texts)} documents")
         embeddings = self.embedding_service.get_embeddings(texts)
 
-        logger.info(f"Adding {len(ids)} documents to collection")
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            embeddings=embeddings,
-            ids=ids,
-        )
+        shards = defaultdict(list)
+        for i, metadata in enumerate(metadatas):
+            shards[shard_key(metadata)].append(i)
+
+        for key, rows in shards.items():
+            # No shard key: the live collection, resolved by the writer
+            collection_name = shard_collection_name(key) if key else None
+            logger.info(f"Adding {len(rows)} documents to collection {collection_name or 'live'}")
+            self.writer.upsert(
+                ids=[ids[i] for i in rows],
+                documents=[texts[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                collection_name=collection_name,
+            )
 
         logger.info("Documents added successfully")
 
@@ -45,25 +111,38 @@ class VectorDBService:
         category_filter: Optional[str] = None,
         subcategory_filter: Optional[str] = None,
         images_only: bool = False,
-        tables_only: bool = False
+        tables_only: bool = False,
+        tenant_filter: Optional[str] = None,
+        expand: Sequence[str] = ()
     ) -> List[Dict]:
-        """Perform semantic search."""
+        """
+        Perform semantic search.
+
+        A search limited to one tenant (or category, whichever the shards are
+        split by) only queries that shard and the live collection. Otherwise
+        every shard is queried concurrently for its top ``n_results``, and the
+        lists are merged.
+
+        With ``expand`` ("neighbors", "linked"), each result gets a ``context``
+        with the chunks its adjacency metadata points to.
+        """
         self.client = get_chroma_client(force_refresh=True)
-        self.collection = get_collection()
 
         # Build where clause
-        where_clause = {}
+        conditions = []
+        if tenant_filter:
+            conditions.append({"tenant": tenant_filter})
         if category_filter:
-            where_clause["category"] = category_filter
+            conditions.append({"category": category_filter})
         if subcategory_filter:
-            where_clause["subcategory"] = subcategory_filter
+            conditions.append({"subcategory": subcategory_filter})
         if images_only:
-            where_clause["has_images"] = True
+            conditions.append({"has_images": True})
         if tables_only:
-            where_clause["table_count"] = {"$gt": 0}
+            conditions.append({"table_count": {"$gt": 0}})
 
         # Get query embedding
-        q_emb = self.embedding_service.get_embeddings([query_text])[0]
+        q_emb = self.embedding_service.get_embeddings([query_text], priority=INTERACTIVE)[0]
 
         # Query
         query_params = {
@@ -71,12 +150,85 @@ class VectorDBService:
             "n_results": n_results,
             "include": ["documents", "metadatas", "distances"]
         }
-        if where_clause:
-            query_params["where"] = where_clause
+        if len(conditions) == 1:
+            query_params["where"] = conditions[0]
+        elif conditions:
+            query_params["where"] = {"$and": conditions}
+
+        shard = {"tenant": tenant_filter, "category": category_filter}.get(settings.CHROMA_SHARD_BY)
+        collections = self.collections(shard)
+
+        with track_stage("chroma_query"):
+            if len(collections) == 1:
+                shard_results = [self._query_shard(collections[0], query_params)]
+            else:
+                shard_results = list(_search_pool().map(
+                    lambda collection: self._query_shard(collection, query_params), collections
+                ))
+
+        # Each shard's results are sorted by distance already
+        merged = heapq.merge(*shard_results, key=lambda result: result["distance"])
+        hits = list(islice(merged, n_results))
+
+        if expand:
+            owners = {
+                result["chunk_id"]: collection
+                for collection, results in zip(collections, shard_results)
+                for result in results
+            }
+            self._expand(hits, owners, expand)
+        return hits
+
+    @staticmethod
+    def _expand(hits: List[Dict], owners: Dict[str, object], expand: Sequence[str]):
+        """
+        Attach context chunks to each hit.
+
+        Chunks that are hits themselves are reused; the rest are read with a
+        single ``get`` per shard (a document's chunks share its shard).
+        """
+        refs = {}
+        for hit in hits:
+            metadata = hit["metadata"]
+            refs[hit["chunk_id"]] = {
+                "previous": metadata.get("prev_chunk_id") if "neighbors" in expand else None,
+                "next": metadata.get("next_chunk_id") if "neighbors" in expand else None,
+                "linked": [
+                    chunk_id for chunk_id in (metadata.get("linked_chunk_ids") or "").split(",") if chunk_id
+                ] if "linked" in expand else [],
+            }
+
+        known = {
+            hit["chunk_id"]: {"chunk_id": hit["chunk_id"], "document_text": hit["document_text"], "metadata": hit["metadata"]}
+            for hit in hits
+        }
+        missing = defaultdict(set)
+        for hit_id, hit_refs in refs.items():
+            for chunk_id in [hit_refs["previous"], hit_refs["next"], *hit_refs["linked"]]:
+                if chunk_id and chunk_id not in known:
+                    missing[owners[hit_id].name].add(chunk_id)
 
-        print("Query Params:", query_params)  # Debugging line
+        collections = {collection.name: collection for collection in owners.values()}
+        with track_stage("chroma_context_get"):
+            for name, chunk_ids in missing.items():
+                chunks = collections[name].get(ids=sorted(chunk_ids), include=["documents", "metadatas"])
+                for chunk_id, text, metadata in zip(chunks["ids"], chunks["documents"], chunks["metadatas"]):
+                    known[chunk_id] = {"chunk_id": chunk_id, "document_text": text, "metadata": metadata}
 
-        results = self.collection.query(**query_params)
+        for hit in hits:
+            hit_refs = refs[hit["chunk_id"]]
+            hit["context"] = {
+                "previous": known.get(hit_refs["previous"]) if hit_refs["previous"] else None,
+                "next": known.get(hit_refs["next"]) if hit_refs["next"] else None,
+                "linked": [known[chunk_id] for chunk_id in hit_refs["linked"] if chunk_id in known],
+            }
+
+    @staticmethod
+    def _query_shard(collection, query_params: dict) -> List[Dict]:
+        """Top results of one collection, formatted."""
+        if collection.count() == 0:
+            return []
+        results = collection.query(**query_params)
 
         # Format results
         formatted_results = []
@@ -91,48 +243,98 @@ class VectorDBService:
 
         return formatted_results
 
+    def replace_document(
+        self,
+        document_id: str,
+        texts: List[str],
+        metadatas: List[dict],
+        ids: List[str]
+    ) -> int:
+        """
+        Replace a document's chunks without a window where it is missing.
+
+        New chunks are upserted first, then chunks the new version no longer
+        has are deleted, including copies left in another shard. Returns the
+        number of chunks removed.
+        """
+        old = {name: chunks["ids"] for name, chunks in self.find_document(document_id).items()}
+        self.add_documents(texts, metadatas, ids)
+        new = {(chunk_id, shard_collection_name(shard_key(m))) for chunk_id, m in zip(ids, metadatas)}
+        removed = 0
+        for collection_name, old_ids in old.items():
+            stale = sorted(chunk_id for chunk_id in old_ids if (chunk_id, collection_name) not in new)
+            if stale:
+                self.writer.delete(ids=stale, collection_name=collection_name)
+                removed += len(stale)
+        logger.info(f"Replaced document {document_id}: {len(ids)} chunks, {removed} removed")
+        return removed
+
+    def delete_document(self, document_id: str) -> int:
+        """
+        Delete all chunks of a document by metadata filter, from every shard.
+
+        A document deleted while a reindex is running is also removed from the
+        shadow collections, so it does not come back after the switch.
+        Returns the number of chunks deleted from the live collections.
+        """
+        deleted = 0
+        for collection_name, chunks in self.find_document(document_id).items():
+            self.writer.delete(ids=chunks["ids"], collection_name=collection_name)
+            deleted += len(chunks["ids"])
+
+        shadow = get_shadow_collection_name()
+        if shadow:
+            for collection_name in get_shard_names(shadow):
+                ids = get_collection(collection_name).get(where={"document_id": document_id}, include=[])["ids"]
+                if ids:
+                    self.writer.delete(ids=ids, collection_name=collection_name)
+
+        logger.info(f"Deleted {deleted} chunks of document {document_id}")
+        return deleted
+
     def list_chunks(
         self,
         document_id: Optional[str] = None,
         limit: int = 100,
         offset: int = 0
     ) -> List[Dict]:
-        """List chunks with pagination."""
-        query_params = {
-            "limit": limit,
-            "offset": offset,
-            "include": ["documents", "metadatas"]
-        }
-
-        if document_id:
-            query_params["where"] = {"document_id": document_id}
-
-        results = self.collection.get(**query_params)
-
+        """List chunks with pagination, shard after shard."""
         chunks = []
-        if results["ids"]:
-            for i in range(len(results["ids"])):
-                chunks.append({
-                    "chunk_id": results["ids"][i],
-                    "text": results["documents"][i],
-                    "metadata": results["metadatas"][i]
-                })
+        if document_id:
+            for found in self.find_document(document_id, include=["documents", "metadatas"]).values():
+                chunks.extend(zip(found["ids"], found["documents"], found["metadatas"]))
+            chunks = chunks[offset:offset + limit]
+        else:
+            for collection in self.collections():
+                if len(chunks) >= limit:
+                    break
+                count = collection.count()
+                if offset >= count:
+                    offset -= count  # Skip the whole shard
+                    continue
+                results = collection.get(limit=limit - len(chunks), offset=offset, include=["documents", "metadatas"])
+                chunks.extend(zip(results["ids"], results["documents"], results["metadatas"]))
+                offset = 0
 
-        return chunks
+        return [
+            {"chunk_id": chunk_id, "text": text, "metadata": metadata}
+            for chunk_id, text, metadata in chunks
+        ]
 
     def list_available_documents(self) -> Dict:
-        """List all documents in the collection."""
-        all_docs = self.collection.get(include=["metadatas"])
+        """List all documents in all shards."""
         documents = {}
 
-        for metadata in all_docs["metadatas"]:
-            doc_id = metadata["document_id"]
-            if doc_id not in documents:
-                documents[doc_id] = {
-                    "filename": metadata["filename"],
-                    "category": metadata["category"],
-                    "subcategory": metadata.get("subcategory"),
-                    "source_path": metadata["source_path"],
-                }
-
-        return documents
\ No newline at end of file
+        for collection in self.collections():
+            for metadata in collection.get(include=["metadatas"])["metadatas"]:
+                doc_id = metadata["document_id"]
+                if doc_id not in documents:
+                    documents[doc_id] = {
+                        "filename": metadata["filename"],
+                        "category": metadata["category"],
+                        "subcategory": metadata.get("subcategory"),
+                        "tenant": metadata.get("tenant") or None,
+                        "source_path": metadata["source_path"],
+                    }
+
+        return documents
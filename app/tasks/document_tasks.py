@@ -2,22 +2,83 @@
 Celery tasks for document processing.
 """
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 from pathlib import Path
 
-from app.core.celery_app import celery_app
-from app.services.document_service import DocumentService
+from celery.exceptions import Retry
+
+from app.core.celery_app import celery_app, PROCESS_PDF_TASK, RECHUNK_TASK
+from app.core.config import settings
+from app.core.metrics import MEMORY_DEFERRED_TOTAL, TASK_PEAK_RSS_MB
+from app.utils.profiling import profile_to, should_profile
+from app.services.conversion_profiles import resolve_profile
+from app.services.docling_cache import file_hash
+from app.services.document_service import DocumentService, read_pdf_source
+from app.services.memory_governor import estimate_task_memory, get_memory_governor, track_peak_rss
+from app.services.pdf_prescan import pdf_page_count
 from app.services.vectordb_service import VectorDBService
+from app.tasks.image_tasks import queue_thumbnails
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(bind=True, name="app.tasks.document_tasks.process_pdf_task")
+def _reserve_memory(
+    task,
+    pdf_path_or_url: str,
+    category: str,
+    conversion_profile: Optional[str] = None,
+    file_key: Optional[str] = None,
+    pages: Optional[int] = None,
+    size: Optional[int] = None
+) -> Tuple[bytes, str, str, int]:
+    """
+    Reserve memory for converting a PDF, or retry ``task`` later.
+
+    The file's hash, page count and size are carried in the retry's kwargs,
+    so a deferred task only reads the PDF again once it is admitted.
+
+    Returns:
+        Tuple of (PDF contents, file hash, conversion profile, estimate in MB)
+    """
+    data = None
+    if file_key is None or pages is None or size is None:
+        data = read_pdf_source(pdf_path_or_url)
+        file_key, pages, size = file_hash(data), pdf_page_count(data), len(data)
+    governor = get_memory_governor()
+
+    # Files that keep killing workers are converted with the lean profile
+    crashes = governor.crash_count(file_key)
+    if crashes >= settings.MEMORY_DEGRADE_AFTER_CRASHES:
+        logger.warning(f"{pdf_path_or_url} crashed {crashes} workers, converting with the low_memory profile")
+        conversion_profile = "low_memory"
+    conversion_profile = resolve_profile(conversion_profile, category)
+
+    estimate = estimate_task_memory(pages, size, conversion_profile)
+    if not governor.try_reserve(task.request.id, file_key, estimate):
+        MEMORY_DEFERRED_TOTAL.inc()
+        raise task.retry(
+            kwargs=dict(task.request.kwargs or {}, file_key=file_key, pages=pages, size=size),
+            countdown=settings.MEMORY_ADMISSION_RETRY_SECONDS,
+            max_retries=None
+        )
+
+    if data is None:
+        data = read_pdf_source(pdf_path_or_url)
+    return data, file_key, conversion_profile, estimate
+
+
+@celery_app.task(bind=True, name=PROCESS_PDF_TASK)
 def process_pdf_task(
     self,
     pdf_path_or_url: str,
     category: str,
-    subcategory: Optional[str] = None
+    subcategory: Optional[str] = None,
+    profile: bool = False,
+    conversion_profile: Optional[str] = None,
+    tenant: Optional[str] = None,
+    file_key: Optional[str] = None,
+    pages: Optional[int] = None,
+    size: Optional[int] = None
 ):
     """
     Process a PDF document and store in vector database.
@@ -26,13 +87,49 @@ def process_pdf_task(
         pdf_path_or_url: Path or URL to PDF
         category: Document category
         subcategory: Document subcategory
+        profile: Capture a sampling profile stored under the task ID
+        conversion_profile: Docling pipeline profile (fast, standard, full, low_memory)
+        tenant: Application or team the document belongs to
+        file_key: Hash of the PDF, set when retried for memory admission
+        pages: Page count of the PDF, set when retried for memory admission
+        size: Size of the PDF in bytes, set when retried for memory admission
 
     Returns:
         dict: Processing results
     """
+    data, file_key, conversion_profile, estimate = _reserve_memory(
+        self, pdf_path_or_url, category, conversion_profile, file_key, pages, size
+    )
+    governor = get_memory_governor()
+
+    profiled = should_profile(profile)
+    succeeded = False
+    try:
+        with profile_to(self.request.id, enabled=profiled), track_peak_rss() as rss:
+            result = _process_pdf(self, pdf_path_or_url, category, subcategory, conversion_profile, data, tenant)
+        succeeded = True
+    finally:
+        governor.release(self.request.id, file_key if succeeded else None)
+
+    TASK_PEAK_RSS_MB.labels(profile=conversion_profile).observe(rss["peak_mb"])
+    result["memory"] = {"estimated_mb": estimate, "peak_rss_mb": round(rss["peak_mb"])}
+    result["profile_id"] = self.request.id if profiled else None
+    return result
+
+
+def _process_pdf(
+    task,
+    pdf_path_or_url: str,
+    category: str,
+    subcategory: Optional[str] = None,
+    conversion_profile: Optional[str] = None,
+    data: Optional[bytes] = None,
+    tenant: Optional[str] = None
+) -> dict:
+    """Run the processing pipeline, reporting progress on ``task``."""
     try:
         # Update task state
-        self.update_state(
+        task.update_state(
             state="STARTED",
             meta={"stage": "initializing", "progress": 0}
         )
@@ -44,21 +141,26 @@ def process_pdf_task(
         vectordb_service = VectorDBService()
 
         # Process PDF
-        self.update_state(
+        task.update_state(
             state="STARTED",
             meta={"stage": "processing_pdf", "progress": 20}
         )
 
+        conversion_stats = {}
         texts, metadatas, ids = doc_service.process_pdf(
             pdf_path_or_url,
             category,
-            subcategory
+            subcategory,
+            conversion_profile,
+            stats=conversion_stats,
+            data=data,
+            tenant=tenant
         )
 
         logger.info(f"Processed {len(texts)} chunks from PDF")
 
         # Store in vector database
-        self.update_state(
+        task.update_state(
             state="STARTED",
             meta={"stage": "storing_embeddings", "progress": 60}
         )
@@ -66,9 +168,10 @@ def process_pdf_task(
         vectordb_service.add_documents(texts, metadatas, ids)
 
         logger.info(f"Stored {len(ids)} chunks in vector database")
+        queue_thumbnails(metadatas)
 
         # Complete
-        self.update_state(
+        task.update_state(
             state="STARTED",
             meta={"stage": "completed", "progress": 100}
         )
@@ -77,11 +180,101 @@ def process_pdf_task(
             "status": "success",
             "chunks_processed": len(texts),
             "document_id": metadatas[0]["document_id"] if metadatas else None,
-            "filename": metadatas[0]["filename"] if metadatas else None
+            "filename": metadatas[0]["filename"] if metadatas else None,
+            "conversion": conversion_stats
         }
 
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}", exc_info=True)
+        task.update_state(
+            state="FAILURE",
+            meta={"error": str(e)}
+        )
+        raise
+
+
+@celery_app.task(bind=True, name=RECHUNK_TASK)
+def rechunk_document_task(
+    self,
+    document_id: str,
+    file_key: Optional[str] = None,
+    pages: Optional[int] = None,
+    size: Optional[int] = None
+):
+    """
+    Chunk and embed a document again from its cached Docling conversion.
+
+    Without a current cached conversion the source is converted again, under
+    a memory reservation like any processing task.
+
+    Args:
+        document_id: ID of a processed document
+        file_key: Hash of the source PDF, set when retried for memory admission
+        pages: Page count of the source PDF, set when retried for memory admission
+        size: Size of the source PDF in bytes, set when retried for memory admission
+
+    Returns:
+        dict: Processing results
+    """
+    try:
+        self.update_state(
+            state="STARTED",
+            meta={"stage": "rechunking", "progress": 0}
+        )
+
+        vectordb_service = VectorDBService()
+        existing = vectordb_service.find_document(document_id, include=["metadatas"])
+        if not existing:
+            raise ValueError(f"Document {document_id} not found")
+        metadata = next(iter(existing.values()))["metadatas"][0]
+        source_path = metadata["source_path"]
+        category = metadata["category"]
+        subcategory = metadata.get("subcategory") or None
+        conversion_profile = resolve_profile(metadata.get("conversion_profile") or None, category)
+        tenant = metadata.get("tenant") or None
+
+        doc_service = DocumentService()
+        cached = doc_service.cached_conversion(document_id, conversion_profile)
+        if cached is not None:
+            document, cached_source_path = cached
+            logger.info(f"Re-chunking {document_id} from its cached conversion")
+            texts, metadatas, ids = doc_service.chunk_document(
+                document, cached_source_path, category, subcategory, conversion_profile, tenant
+            )
+        else:
+            logger.info(f"No cached conversion of {document_id}, converting {source_path}")
+            data, file_key, conversion_profile, _ = _reserve_memory(
+                self, source_path, category, conversion_profile, file_key, pages, size
+            )
+            governor = get_memory_governor()
+            succeeded = False
+            try:
+                texts, metadatas, ids = doc_service.process_pdf(
+                    source_path, category, subcategory, conversion_profile, data=data, tenant=tenant
+                )
+                succeeded = True
+            finally:
+                governor.release(self.request.id, file_key if succeeded else None)
+
+        self.update_state(
+            state="STARTED",
+            meta={"stage": "storing_embeddings", "progress": 60}
+        )
+        removed = vectordb_service.replace_document(document_id, texts, metadatas, ids)
+        queue_thumbnails(metadatas)
+
+        return {
+            "status": "success",
+            "chunks_processed": len(texts),
+            "chunks_removed": removed,
+            "document_id": document_id,
+            "filename": metadata["filename"]
+        }
+
+    except Retry:
+        raise
+    except Exception as e:
+        logger.error(f"Error re-chunking document {document_id}: {str(e)}", exc_info=True)
         self.update_state(
             state="FAILURE",
             meta={"error": str(e)}
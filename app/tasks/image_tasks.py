@@ -0,0 +1,48 @@
+"""
+Celery tasks for stored images.
+"""
+import logging
+from typing import Iterable, List
+
+from app.core.celery_app import celery_app, THUMBNAIL_TASK
+from app.core.metrics import track_stage
+from app.services.image_store import ImageStore
+
+logger = logging.getLogger(__name__)
+
+
+def image_hashes(metadatas: Iterable[dict]) -> List[str]:
+    """Distinct image hashes referenced by chunk metadata."""
+    hashes = {h for metadata in metadatas for h in (metadata.get("image_hashes") or "").split(",") if h}
+    return sorted(hashes)
+
+
+def queue_thumbnails(metadatas: Iterable[dict]):
+    """Generate thumbnails for the images of processed chunks in the background."""
+    hashes = image_hashes(metadatas)
+    if hashes:
+        generate_thumbnails_task.delay(hashes)
+
+
+@celery_app.task(name=THUMBNAIL_TASK)
+def generate_thumbnails_task(hashes: List[str]):
+    """
+    Generate WebP thumbnails for stored images.
+
+    Args:
+        hashes: Content hashes of stored images
+
+    Returns:
+        dict: Number of thumbnails available and images that failed
+    """
+    store = ImageStore()
+    generated, failed = 0, []
+    for image_hash in hashes:
+        try:
+            with track_stage("thumbnail"):
+                store.ensure_thumbnail(ImageStore.validate_hash(image_hash))
+            generated += 1
+        except Exception as e:
+            logger.warning(f"Could not generate thumbnail for image {image_hash}: {str(e)}")
+            failed.append(image_hash)
+    return {"thumbnails": generated, "failed": failed}
@@ -0,0 +1,41 @@
+"""
+Celery tasks for reindexing the vector database.
+"""
+import logging
+
+from app.core.celery_app import celery_app, REINDEX_TASK
+from app.core.config import settings
+from app.services.reindex_service import ReindexService
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    name=REINDEX_TASK,
+    time_limit=settings.REINDEX_TASK_TIME_LIMIT,
+    soft_time_limit=settings.REINDEX_TASK_TIME_LIMIT - 60,
+)
+def reindex_collection_task(self, reindex_id: str):
+    """
+    Build the shadow collection for a reindex and switch the alias to it.
+
+    Args:
+        reindex_id: ID of the reindex state created by the API
+
+    Returns:
+        dict: Final reindex state
+    """
+    def report(state: dict):
+        self.update_state(
+            state="STARTED",
+            meta={
+                "stage": state["phase"],
+                "copied": state["copied"],
+                "reprocessed": state["reprocessed"],
+                "pending_docs": len(state["pending_docs"]) - len(state["done_docs"]),
+            }
+        )
+
+    logger.info(f"Starting reindex {reindex_id}")
+    return ReindexService().run(reindex_id, progress=report)
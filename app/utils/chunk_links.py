@@ -0,0 +1,67 @@
+"""
+Adjacency between the chunks of a document.
+
+Computed at ingest time and stored in chunk metadata, so a search can return
+each hit with its context in one batched read:
+
+- ``prev_chunk_id`` / ``next_chunk_id``: neighbours in reading order
+- ``linked_chunk_ids``: chunks holding a figure or table this chunk refers to
+  ("see Figure 3", "Table 2 shows"), and chunks referring to the figures and
+  tables this chunk holds
+"""
+import re
+from typing import List, Optional, Set, Tuple
+
+from docling_core.types.doc import PictureItem, TableItem
+
+# "Figure 3", "Fig. 3", "Table 2"
+_ASSET_REFERENCE = re.compile(r"\b(fig(?:ure)?|table)\.?\s*(\d+)", re.IGNORECASE)
+
+
+def _asset_key(kind: str, number: str) -> Tuple[str, int]:
+    return ("table" if kind.lower() == "table" else "figure", int(number))
+
+
+def asset_label(caption: str) -> Optional[Tuple[str, int]]:
+    """("figure" | "table", number) of a caption that starts with its label."""
+    match = _ASSET_REFERENCE.match(caption.strip())
+    return _asset_key(*match.groups()) if match else None
+
+
+def chunk_links(document, chunks: list) -> List[Set[int]]:
+    """Indexes of the chunks each chunk is linked to through figure and table references."""
+    owners = {}
+    held = []
+    for i, chunk in enumerate(chunks):
+        labels = set()
+        for item in chunk.meta.doc_items:
+            if isinstance(item, (PictureItem, TableItem)):
+                try:
+                    label = asset_label(item.caption_text(document))
+                except Exception:
+                    label = None
+                if label:
+                    labels.add(label)
+                    owners.setdefault(label, i)
+        held.append(labels)
+
+    links = [set() for _ in chunks]
+    for i, chunk in enumerate(chunks):
+        for kind, number in _ASSET_REFERENCE.findall(chunk.text):
+            owner = owners.get(_asset_key(kind, number))
+            if owner is not None and owner != i:
+                links[i].add(owner)
+                links[owner].add(i)
+    return links
+
+
+def adjacency_metadata(ids: List[str], links: List[Set[int]]) -> List[dict]:
+    """Adjacency metadata fields for chunks in reading order."""
+    return [
+        {
+            "prev_chunk_id": ids[i - 1] if i > 0 else "",
+            "next_chunk_id": ids[i + 1] if i + 1 < len(ids) else "",
+            "linked_chunk_ids": ",".join(ids[j] for j in sorted(links[i])),
+        }
+        for i in range(len(ids))
+    ]
@@ -0,0 +1,104 @@
+"""
+CPU thread budget for worker processes.
+
+Docling's layout, table and OCR models run on torch/ONNX, whose thread pools
+default to one thread per core. With several prefork children on one machine
+every child does that, and the oversubscription costs more than it gains.
+Each child instead gets ``WORKER_THREADS_PER_CHILD`` threads (by default the
+cores divided by the worker concurrency) and, with ``WORKER_CPU_AFFINITY``,
+its own set of cores.
+"""
+import os
+import logging
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by the native libraries when they initialize
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+POOL_SIZE_ENV_VAR = "WORKER_POOL_CONCURRENCY"
+CHILD_THREADS_ENV_VAR = "WORKER_CHILD_THREADS"
+
+
+def available_cores() -> List[int]:
+    """Cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def threads_per_child(concurrency: Optional[int] = None) -> int:
+    """Threads each worker child may use."""
+    if settings.WORKER_THREADS_PER_CHILD:
+        return settings.WORKER_THREADS_PER_CHILD
+    # Already decided for this process; its affinity may have shrunk since
+    if concurrency is None and os.environ.get(CHILD_THREADS_ENV_VAR):
+        return int(os.environ[CHILD_THREADS_ENV_VAR])
+    concurrency = concurrency or pool_concurrency() or settings.CELERY_WORKER_CONCURRENCY
+    return max(1, len(available_cores()) // max(1, concurrency))
+
+
+def configure_worker_pool(concurrency: int):
+    """
+    In the worker parent: record the pool size and set the thread variables before children fork.
+
+    Children inherit both, so libraries they initialize start with the budget.
+    """
+    os.environ[POOL_SIZE_ENV_VAR] = str(concurrency)
+    threads = threads_per_child(concurrency)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+
+def pool_concurrency() -> Optional[int]:
+    """Pool size recorded by ``configure_worker_pool``."""
+    value = os.environ.get(POOL_SIZE_ENV_VAR)
+    return int(value) if value else None
+
+
+def apply_cpu_budget(threads: int, child_index: Optional[int] = None, pin: bool = False) -> dict:
+    """
+    Limit this process to ``threads`` threads, optionally pinned to its own cores.
+
+    Args:
+        threads: Threads for torch and the BLAS/OpenMP pools
+        child_index: Position of the process among its siblings; picks the cores to pin to
+        pin: Set CPU affinity (Linux only)
+
+    Returns:
+        dict: The applied budget, for logging
+    """
+    os.environ[CHILD_THREADS_ENV_VAR] = str(threads)
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        # Inter-op parallelism can only be set before torch first uses it
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    except ImportError:
+        pass
+
+    cores = None
+    if pin and child_index is not None and hasattr(os, "sched_setaffinity"):
+        allowed = available_cores()
+        start = (child_index * threads) % len(allowed)
+        cores = [allowed[(start + i) % len(allowed)] for i in range(min(threads, len(allowed)))]
+        os.sched_setaffinity(0, cores)
+
+    budget = {"threads": threads, "child_index": child_index, "cores": cores}
+    logger.info(f"CPU budget for pid {os.getpid()}: {budget}")
+    return budget
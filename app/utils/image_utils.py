@@ -3,15 +3,16 @@ Image extraction utilities.
 """
 from pathlib import Path
 import re
-from celery import uuid
 from docling_core.types.doc import DocItemLabel
 from docling_core.types.doc import ImageRefMode, PictureItem, TableItem
 
-def get_image_info(doc, chunk, image_dir_path: str) -> dict:
-    """Get image information from a document chunk."""
+from app.core.metrics import track_stage
+from app.services.image_store import image_url
+
+def get_image_info(doc, chunk, image_store) -> dict:
+    """Get image information from a document chunk, storing its figures in ``image_store``."""
     picture_lookup = {item.self_ref: item for item in doc.pictures}
     table_lookup = {item.self_ref: item for item in doc.tables}
-    image_dir_path.mkdir(parents=True, exist_ok=True)
     image_info = {
         "has_images": False,
         "figures": [],
@@ -40,21 +41,22 @@ def get_image_info(doc, chunk, image_dir_path: str) -> dict:
 
                 # --- Handle Pictures ---
                 if isinstance(target_item, PictureItem):
-                    fig_id = uuid.uuid4().hex[:8]
                     image_info["has_images"] = True
                     print(f"Found picture item on page {page_no} with caption: {caption_text}")
-                    image_filename = f"p{page_no}_{fig_id}.png"
-                    image_path = image_dir_path / image_filename
                     try:
-                        with image_path.open("wb") as fp:
-                            target_item.get_image(doc).save(fp, "PNG")
+                        image = target_item.get_image(doc)
+                        if image is None:
+                            continue  # Profile without picture images
+                        with track_stage("image_write"):
+                            image_hash = image_store.put(image)
                         image_info["figures"].append({
-                                "image_url": str(image_path), 
+                                "image_hash": image_hash,
+                                "image_url": image_url(image_hash),
                                 "caption": caption_text,
                                 "page_no": page_no,
                                 "type": "figure"
                             })
-                        print(f"Saved picture image: {image_path}")
+                        print(f"Stored picture image: {image_hash}")
                     except Exception as e:
                         print(f"Error saving picture image: {e}")
                     
@@ -0,0 +1,93 @@
+"""
+Sampling profiler producing collapsed-stack profiles.
+
+The collapsed format (``frame;frame;frame count`` per line) loads directly
+into speedscope and flamegraph.pl.
+"""
+import os
+import re
+import sys
+import random
+import threading
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class SamplingProfiler:
+    """Periodically samples the call stack of one thread."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: Optional[float] = None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or settings.PROFILING_INTERVAL
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: Path):
+        """Write samples as a collapsed-stack file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def should_profile(requested: bool) -> bool:
+    """Profile when asked to, or for a random sample of all work."""
+    return requested or random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def get_profile_path(profile_id: str) -> Path:
+    """Location of the stored profile for a task or request ID."""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id: {profile_id}")
+    return Path(settings.PROFILE_DIR) / f"{profile_id}.collapsed"
+
+
+@contextmanager
+def profile_to(profile_id: str, enabled: bool = True):
+    """Profile the enclosed block and store the result under ``profile_id``."""
+    if not enabled:
+        yield
+        return
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        try:
+            profiler.write_collapsed(get_profile_path(profile_id))
+            logger.info(f"Stored profile {profile_id} ({sum(profiler.samples.values())} samples)")
+        except Exception as e:
+            logger.error(f"Failed to store profile {profile_id}: {e}")
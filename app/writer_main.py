@@ -0,0 +1,81 @@
+"""
+Single-writer service for the Chroma collections.
+
+Workers and the API send already-embedded batches here instead of writing
+to CHROMA_PERSIST_DIR themselves (set CHROMA_WRITER_URL on them). Run exactly
+one instance, with one uvicorn worker, on the host that owns the directory:
+
+    uvicorn app.writer_main:app --host 0.0.0.0 --port 8100 --workers 1
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel
+
+from app.core.metrics import render_metrics
+from app.services.chroma_writer import GroupCommitWriter
+
+writer = GroupCommitWriter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the commit thread; on shutdown, commit what is queued before exiting."""
+    writer.start()
+    yield
+    writer.stop()
+
+
+app = FastAPI(
+    title="Chroma Writer",
+    description="Group-commit writer for the shared vector database",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+
+class WriteRequest(BaseModel):
+    """One write; embeddings are computed by the sender."""
+
+    op: Literal["upsert", "update", "delete"]
+    collection: Optional[str] = None  # None means the live (aliased) collection
+    ids: Optional[List[str]] = None
+    documents: Optional[List[Optional[str]]] = None
+    metadatas: Optional[List[Dict[str, Any]]] = None
+    embeddings: Optional[List[List[float]]] = None
+    where: Optional[Dict[str, Any]] = None
+
+
+@app.post("/writes")
+async def submit_write(request: WriteRequest):
+    """
+    Queue a write and return once the commit that includes it has finished.
+    """
+    payload = request.model_dump(exclude={"op", "collection"}, exclude_none=True)
+    try:
+        future = writer.submit(request.op, request.collection, **payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        await asyncio.wrap_future(future)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Write failed: {str(e)}"
+        )
+    return {"status": "committed", "records": len(request.ids or [])}
+
+
+@app.get("/health")
+async def health():
+    """Health check."""
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
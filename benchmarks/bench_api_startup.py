@@ -0,0 +1,71 @@
+"""
+API cold-start benchmark.
+
+Imports the FastAPI application in fresh interpreters and reports import
+time, peak RSS and whether any worker-only heavy modules were loaded.
+
+Usage:
+    python benchmarks/bench_api_startup.py [--runs 5] [--module app.main]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that belong in Celery workers only
+HEAVY_MODULES = ["docling", "docling_core", "torch", "transformers", "onnxruntime", "chromadb", "openai"]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"import_seconds": elapsed, "peak_rss_mb": rss_kb / 1024, "heavy_modules": loaded}}))
+"""
+
+
+def run_once(module: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app.main")
+    args = parser.parse_args()
+
+    results = [run_once(args.module) for _ in range(args.runs)]
+    import_times = [r["import_seconds"] for r in results]
+    rss = [r["peak_rss_mb"] for r in results]
+    heavy = sorted({m for r in results for m in r["heavy_modules"]})
+
+    print(f"module:           {args.module}")
+    print(f"runs:             {args.runs}")
+    print(f"import time (s):  median {statistics.median(import_times):.3f}  min {min(import_times):.3f}")
+    print(f"peak RSS (MB):    median {statistics.median(rss):.1f}")
+    print(f"heavy modules:    {', '.join(heavy) if heavy else 'none'}")
+
+    # Non-zero exit lets CI catch a worker dependency leaking into the API
+    sys.exit(1 if heavy else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Conversion profile benchmark.
+
+Converts the given PDFs with each Docling pipeline profile, each profile in
+a fresh interpreter, and reports pages/sec and peak RSS. The Docling cache is
+bypassed. Profiles with picture descriptions call OpenAI, so they need a
+real OPENAI_API_KEY.
+
+Usage:
+    python benchmarks/bench_conversion_profiles.py sample.pdf [more.pdf ...] [--profiles fast,standard,full,low_memory] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, resource, sys, time
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from app.services.conversion_profiles import build_pipeline_options
+
+converter = DocumentConverter(format_options={{
+    InputFormat.PDF: PdfFormatOption(pipeline_options=build_pipeline_options({profile!r}))
+}})
+converter.initialize_pipeline(InputFormat.PDF)  # Model loading is not part of the measurement
+
+pages, start = 0, time.perf_counter()
+for path in {paths!r}:
+    pages += len(converter.convert(path).document.pages)
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"pages": pages, "seconds": elapsed, "peak_rss_mb": rss_kb / 1024}}))
+"""
+
+
+def run_profile(profile: str, paths: list) -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    code = PROBE.format(profile=profile, paths=paths)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["profile"] = profile
+    result["pages_per_second"] = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--profiles", default="fast,standard,full,low_memory")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    paths = [str(Path(p).resolve()) for p in args.pdfs]
+    results = [run_profile(profile, paths) for profile in args.profiles.split(",")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'profile':<10} {'pages':>6} {'seconds':>9} {'pages/s':>8} {'peak RSS (MB)':>14}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['pages']:>6} {r['seconds']:>9.2f} {r['pages_per_second']:>8.2f} {r['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
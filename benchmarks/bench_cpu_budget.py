@@ -0,0 +1,124 @@
+"""
+CPU budget sweep for worker processes.
+
+For every (concurrency, threads per child) pair, starts ``concurrency``
+processes that each convert the given PDFs with ``threads`` threads, the way
+prefork children do under the worker CPU budget. Model loading happens
+before the clock starts. Reports aggregate pages/sec per pair and the best
+pair for this machine; use it for ``-c`` and ``WORKER_THREADS_PER_CHILD``.
+
+Usage:
+    python benchmarks/bench_cpu_budget.py sample.pdf [more.pdf ...] \\
+        [--concurrency 1,2,4] [--threads 1,2,4] [--profile fast] [--pin] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.utils.cpu_budget import THREAD_ENV_VARS  # noqa: E402
+
+CHILD = """
+import json, sys, time
+from app.utils.cpu_budget import apply_cpu_budget
+apply_cpu_budget({threads}, child_index={index}, pin={pin})
+
+from docling.datamodel.base_models import InputFormat
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from app.services.conversion_profiles import build_pipeline_options
+
+converter = DocumentConverter(format_options={{
+    InputFormat.PDF: PdfFormatOption(pipeline_options=build_pipeline_options({profile!r}))
+}})
+converter.initialize_pipeline(InputFormat.PDF)
+print("ready", flush=True)
+sys.stdin.readline()
+
+pages = 0
+for path in {paths!r}:
+    pages += len(converter.convert(path).document.pages)
+print(json.dumps({{"pages": pages}}), flush=True)
+"""
+
+
+def run_pair(concurrency: int, threads: int, paths: list, profile: str, pin: bool) -> dict:
+    env = dict(os.environ)
+    # Thread pools read these at library import, before apply_cpu_budget runs
+    env.update({var: str(threads) for var in THREAD_ENV_VARS})
+
+    children = []
+    for index in range(concurrency):
+        code = CHILD.format(threads=threads, index=index, pin=pin, profile=profile, paths=paths)
+        children.append(subprocess.Popen(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        ))
+    for child in children:
+        if child.stdout.readline().strip() != "ready":
+            raise RuntimeError(f"Child failed to start (concurrency={concurrency}, threads={threads})")
+
+    start = time.perf_counter()
+    for child in children:
+        child.stdin.write("go\n")
+        child.stdin.flush()
+    pages = 0
+    for child in children:
+        pages += json.loads(child.stdout.readline())["pages"]
+        child.wait()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "threads": threads,
+        "pages": pages,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--threads", default="1,2,4")
+    parser.add_argument("--profile", default="fast")
+    parser.add_argument("--pin", action="store_true", help="Pin each child to its own cores")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    paths = [str(Path(p).resolve()) for p in args.pdfs]
+    cores = os.cpu_count() or 1
+    results = []
+    for concurrency in map(int, args.concurrency.split(",")):
+        for threads in map(int, args.threads.split(",")):
+            if concurrency * threads > cores * 2:
+                continue  # Heavily oversubscribed; not worth measuring
+            results.append(run_pair(concurrency, threads, paths, args.profile, args.pin))
+    if not results:
+        sys.exit("No (concurrency, threads) pair within twice the core count")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"cores: {cores}, profile: {args.profile}, pinned: {args.pin}")
+    print(f"{'concurrency':>11} {'threads':>8} {'pages':>6} {'seconds':>9} {'pages/s':>8}")
+    for r in results:
+        print(f"{r['concurrency']:>11} {r['threads']:>8} {r['pages']:>6} {r['seconds']:>9.2f} {r['pages_per_second']:>8.2f}")
+    best = max(results, key=lambda r: r["pages_per_second"])
+    print(f"best: -c {best['concurrency']} with WORKER_THREADS_PER_CHILD={best['threads']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Per-tenant search latency, one collection vs one collection per tenant.
+
+Fills a throwaway Chroma directory with random embeddings for a growing
+number of tenants (same chunks per tenant), then times tenant-filtered
+queries against the single collection (``where`` filter, as without
+``CHROMA_SHARD_BY``) and against the tenant's own shard. Shard latency
+should stay flat as the corpus grows; the single collection's should not.
+
+Usage:
+    python benchmarks/bench_sharded_search.py [--tenants 1,4,16] [--chunks 2000] [--dim 1536] [--queries 50] [--json]
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+
+
+def vectors(n: int, dim: int) -> list:
+    return [[random.random() for _ in range(dim)] for _ in range(n)]
+
+
+def timed_queries(collection, queries: list, where=None) -> float:
+    """Median query latency in ms."""
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[q], n_results=10, where=where)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(tenant_counts: list, chunks: int, dim: int, n_queries: int) -> list:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(), settings=ChromaSettings(anonymized_telemetry=False))
+    single = client.get_or_create_collection("single")
+    queries = vectors(n_queries, dim)
+    results = []
+    loaded = 0
+    for tenants in tenant_counts:
+        for t in range(loaded, tenants):
+            embeddings = vectors(chunks, dim)
+            ids = [f"t{t}-{i}" for i in range(chunks)]
+            metadatas = [{"tenant": f"t{t}"}] * chunks
+            shard = client.get_or_create_collection(f"single__t{t}")
+            for start in range(0, chunks, 1000):
+                batch = slice(start, start + 1000)
+                single.add(ids=ids[batch], embeddings=embeddings[batch], metadatas=metadatas[batch])
+                shard.add(ids=ids[batch], embeddings=embeddings[batch], metadatas=metadatas[batch])
+        loaded = tenants
+
+        results.append({
+            "tenants": tenants,
+            "corpus": tenants * chunks,
+            "single_ms": timed_queries(single, queries, where={"tenant": "t0"}),
+            "shard_ms": timed_queries(client.get_collection("single__t0"), queries),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", default="1,4,16")
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks per tenant")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    random.seed(0)
+    results = run([int(t) for t in args.tenants.split(",")], args.chunks, args.dim, args.queries)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'tenants':>8} {'corpus':>8} {'single (ms)':>12} {'shard (ms)':>11}")
+    for r in results:
+        print(f"{r['tenants']:>8} {r['corpus']:>8} {r['single_ms']:>12.2f} {r['shard_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
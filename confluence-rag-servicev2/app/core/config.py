@@ -13,9 +13,49 @@ class Settings(BaseSettings):
     OUTPUT_DIR: Path = Path("/app/output")
     RATE_LIMIT_DELAY: float = 1.5
     
+    # Crawler (shared adaptive token bucket)
+    CRAWL_MODE: str = "bulk"  # "bulk" (CQL descendants) or "tree" (children per page)
+    BULK_PAGE_SIZE: int = 50
+    CRAWL_CONCURRENCY: int = 8
+    RATE_LIMIT_RPS: float = 5.0
+    RATE_LIMIT_BURST: int = 10
+    RATE_LIMIT_MIN_RPS: float = 0.2
+    RATE_LIMIT_MAX_RPS: float = 20.0
+    RATE_LIMIT_TARGET_LATENCY: float = 2.0
+    
+    # HTML preprocessing: "lxml" (fast) or "bs4" (original html.parser)
+    HTML_ENGINE: str = "lxml"
+    
+    # Docling conversion (in-memory batches on a process pool; 0 = in-thread)
+    CONVERT_WORKERS: int = 2
+    CONVERT_BATCH_SIZE: int = 8
+    
+    # Image downloads (share the crawler's rate limiter)
+    IMAGE_FETCH_CONCURRENCY: int = 8
+    
+    # Background jobs
+    MAX_CONCURRENT_JOBS: int = 2
+    
+    # Vector store indexing (same Chroma directory/collection as the main API)
+    INDEX_ENABLED: bool = True
+    OPENAI_API_KEY: str = ""
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-large"
+    CHROMA_PERSIST_DIR: str = "./data/chroma"
+    CHROMA_COLLECTION_NAME: str = "document_collection"
+    CHROMA_UPSERT_BATCH_SIZE: int = 500
+    CHROMA_WRITER_URL: str = ""  # Main API's single-writer service; empty writes locally
+    CONFLUENCE_CATEGORY: str = "confluence"
+    EMBED_BATCH_TOKENS: int = 100_000  # Per embeddings request (API limit is 300k)
+    EMBED_BATCH_MAX_INPUTS: int = 2048
+    EMBED_MAX_INPUT_TOKENS: int = 8191
+    
+    @property
+    def STATE_DB_PATH(self) -> Path:
+        return self.OUTPUT_DIR / "sync_state.db"
+
     class Config:
         env_file = ".env"
 
 settings = Settings()
-for d in ["html", "images", "chunks"]:
+for d in ["images", "chunks", "jobs"]:
     (settings.OUTPUT_DIR / d).mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -1,8 +1,12 @@
+import asyncio
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
 from pydantic import BaseModel
-from app.services.pipeline import RAGPipeline
+from app.services.jobs import JobManager, FINISHED
 
 app = FastAPI(title="Confluence RAG Service")
+jobs = JobManager()
 
 class Request(BaseModel):
     url: str
@@ -10,12 +14,63 @@ class Request(BaseModel):
     token: str
     recursive: bool = True
     max_depth: int = -1
+    full_resync: bool = False  # Reprocess pages even if their version is unchanged
+    traversal: Optional[Literal["bulk", "tree"]] = None  # Defaults to CRAWL_MODE
 
-@app.post("/process")
+@app.post("/process", status_code=202)
 def run_process(req: Request):
+    """Start a background crawl; chunks stream from /jobs/{job_id}/chunks as pages finish."""
     try:
-        pipeline = RAGPipeline(req)
-        result = pipeline.run()
-        return {"success": True, **result}
+        job = jobs.submit(req)
+        return {"success": True, **job, "chunks_url": f"/jobs/{job['job_id']}/chunks"}
     except Exception as e:
-        raise HTTPException(500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(500, detail=str(e))
+
+class ResumeRequest(BaseModel):
+    username: str  # Credentials are never persisted, so resuming needs them again
+    token: str
+
+@app.post("/jobs/{job_id}/resume", status_code=202)
+def resume_job(job_id: str, creds: ResumeRequest):
+    """Continue a failed/interrupted crawl from its checkpoint instead of from the root."""
+    job = jobs.get(job_id)
+    if not job: raise HTTPException(404, detail="Job not found")
+    req = Request(url=job["url"], username=creds.username, token=creds.token, recursive=job["recursive"],
+                  max_depth=job["max_depth"], full_resync=job["full_resync"], traversal=job.get("traversal"))
+    try:
+        job = jobs.resume(job_id, req)
+    except ValueError as e:
+        raise HTTPException(409, detail=str(e))
+    return {"success": True, **job, "chunks_url": f"/jobs/{job_id}/chunks"}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job: raise HTTPException(404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/chunks")
+async def stream_chunks(job_id: str, follow: bool = True):
+    """
+    NDJSON stream of the job's chunks and tombstones.
+    With follow=true the stream stays open until the job finishes (like tail -f).
+    """
+    if not jobs.get(job_id): raise HTTPException(404, detail="Job not found")
+    return StreamingResponse(_tail(job_id, follow), media_type="application/x-ndjson")
+
+async def _tail(job_id, follow):
+    with open(jobs.chunks_path(job_id), "r", encoding="utf-8") as f:
+        while True:
+            pos = f.tell()
+            line = f.readline()
+            if line.endswith("\n"):
+                yield line
+                continue
+            # Partial line (writer mid-write) or EOF: rewind and wait for more
+            f.seek(pos)
+            if not follow or jobs.get(job_id)["status"] in FINISHED:
+                # One last drain: the writer may have finished between reads
+                rest = f.read()
+                if rest: yield rest
+                break
+            await asyncio.sleep(0.5)
@@ -1,9 +1,13 @@
 import time
+import asyncio
 import logging
 import random
+import httpx
 import requests
 from functools import wraps
+from urllib.parse import urlencode
 from app.core.config import settings
+from app.services.rate_limiter import AdaptiveRateLimiter
 
 logger = logging.getLogger("confluence")
 
@@ -80,4 +84,99 @@ class ConfluenceClient:
     def _throttle(self):
         elapsed = time.time() - self.last_req
         if elapsed < settings.RATE_LIMIT_DELAY:
-            time.sleep(settings.RATE_LIMIT_DELAY - elapsed)
\ No newline at end of file
+            time.sleep(settings.RATE_LIMIT_DELAY - elapsed)
+
+def _retry_after(resp, default=60):
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+class AsyncConfluenceClient:
+    """
+    Async counterpart of ConfluenceClient for concurrent fetchers.
+    All requests go through one shared AdaptiveRateLimiter instead of a fixed sleep.
+    """
+    def __init__(self, base_url, user, token, limiter=None, transport=None, max_retries=5, backoff_factor=1.5):
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.api_calls = 0
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            auth=(user, token),
+            headers={"Accept": "application/json"},
+            timeout=20,
+            follow_redirects=True,  # Attachment downloads redirect to the media service
+            transport=transport,
+            limits=httpx.Limits(max_connections=settings.CRAWL_CONCURRENCY * 2),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def request(self, method, url, ok_statuses=(), **kwargs):
+        """
+        Rate-limited request. 429s pause every worker; 5xx back off like with_retry.
+        Statuses in ok_statuses (e.g. 304) are returned instead of raised.
+        """
+        retries = 0
+        while True:
+            await self.limiter.acquire()
+            start = time.monotonic()
+            resp = await self.http.request(method, url, **kwargs)
+            self.api_calls += 1
+
+            if resp.status_code == 429:
+                self.limiter.pause(_retry_after(resp) + 1)
+                continue
+
+            if resp.status_code >= 500 and retries < self.max_retries:
+                sleep_time = self.backoff_factor * (2 ** retries) + random.uniform(0, 1)
+                logger.warning(f"⚠️ Error {resp.status_code}. Retrying in {sleep_time:.1f}s...")
+                await asyncio.sleep(sleep_time)
+                retries += 1
+                continue
+
+            if resp.status_code not in ok_statuses:
+                resp.raise_for_status()
+            self.limiter.record_latency(time.monotonic() - start)
+            return resp
+
+    async def get_page_with_children(self, page_id):
+        """Same single call as the sync client: body AND children via 'expand' (+ version for incremental sync)."""
+        params = {"expand": "body.storage,children.page,space,version"}
+        resp = await self.request("GET", f"/rest/api/content/{page_id}", params=params)
+        return resp.json()
+
+    async def get_page(self, page_id):
+        """Single page with ancestors, so descendant depths can be computed relative to it."""
+        params = {"expand": "body.storage,space,version,ancestors"}
+        resp = await self.request("GET", f"/rest/api/content/{page_id}", params=params)
+        return resp.json()
+
+    async def iter_descendants(self, root_id, start_url=None, limit=None):
+        """
+        All descendant pages of root_id via paginated CQL, bodies and ancestors expanded.
+        Yields (url, pages, next_url) per API call (limit pages each), following _links.next;
+        start_url resumes from a previously yielded url.
+        """
+        url = start_url or "/rest/api/content/search?" + urlencode({
+            "cql": f"ancestor={root_id} and type=page",
+            "expand": "body.storage,space,version,ancestors",
+            "limit": limit or settings.BULK_PAGE_SIZE,
+        })
+        while url:
+            resp = await self.request("GET", url)
+            data = resp.json()
+            links = data.get('_links', {})
+            # next is relative to _links.base (which already includes /wiki)
+            next_url = links.get('base', '') + links['next'] if links.get('next') else None
+            yield url, data.get('results', []), next_url
+            url = next_url
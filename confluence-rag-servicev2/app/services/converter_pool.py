@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.core.config import settings
+
+logger = logging.getLogger("converter_pool")
+
+# One converter per worker process, built once by the pool initializer
+_converter = None
+
+def _init_worker():
+    global _converter
+    from docling.document_converter import DocumentConverter
+    from docling.datamodel.base_models import InputFormat
+    _converter = DocumentConverter(allowed_formats=[InputFormat.HTML])
+
+def convert_batch(pages):
+    """
+    Convert [(page_id, html)] from in-memory streams with one convert_all call.
+    Returns {page_id: [item texts in reading order]}; failed pages map to None.
+    Only plain strings cross the process boundary, never DoclingDocuments.
+    """
+    from docling.datamodel.base_models import DocumentStream, ConversionStatus
+    streams = [DocumentStream(name=f"{page_id}.html", stream=BytesIO(html.encode("utf-8"))) for page_id, html in pages]
+    results = {page_id: None for page_id, _ in pages}
+    for res in _converter.convert_all(streams, raises_on_error=False):
+        page_id = res.input.file.stem
+        if res.status not in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+            logger.error(f"❌ Conversion failed for page {page_id}: {res.status}")
+            continue
+        # Tables/pictures have no .text; they were markers-only in our HTML anyway
+        results[page_id] = [getattr(item, "text", "") for item, _level in res.document.iterate_items()]
+    return results
+
+class ConverterPool:
+    """
+    Docling conversions on worker processes (spawned, so the crawler's threads
+    and event loop aren't forked). CONVERT_WORKERS=0 converts on a single thread.
+    """
+    def __init__(self, workers=None):
+        workers = settings.CONVERT_WORKERS if workers is None else workers
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker)
+        self.workers = max(workers, 1)
+
+    async def convert(self, pages):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, convert_batch, pages)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_converter_pool():
+    """Shared across jobs so worker processes (and their models) are only started once."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConverterPool()
+    return _pool
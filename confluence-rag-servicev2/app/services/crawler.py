@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from app.core.config import settings
+from app.services.frontier import FrontierStore
+
+logger = logging.getLogger("crawler")
+
+_DONE = object()
+
+class ConfluenceCrawler:
+    """
+    Page-tree crawler with two traversal modes, both yielding (data, depth, parent_title):
+    - tree: N concurrent fetchers walk children level by level (one call per page)
+    - bulk: paginated CQL over all descendants, 50-100 pages per call; depth and
+      parent title are rebuilt from each page's ancestors
+    A bounded buffer keeps fetching only a little ahead of processing.
+
+    The frontier (visited set, pending pages, bulk listing position) lives in a
+    JobFrontier, so a crawl over the same frontier resumes instead of restarting.
+    Pages already marked done there are never fetched or yielded again; the
+    consumer marks a yielded page done once its output is checkpointed.
+    """
+    def __init__(self, client, concurrency=None, frontier=None):
+        self.client = client
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+        self.frontier = frontier or FrontierStore(":memory:").for_job("crawl")
+
+    def crawl(self, root_id, recursive=True, max_depth=-1, mode=None):
+        mode = mode or settings.CRAWL_MODE
+        if mode == "bulk":
+            return self.crawl_bulk(root_id, recursive, max_depth)
+        return self.crawl_tree(root_id, recursive, max_depth)
+
+    async def crawl_bulk(self, root_id, recursive=True, max_depth=-1):
+        root_level = self.frontier.root_level()
+        if root_level is None or not self.frontier.is_done(root_id):
+            root = await self.client.get_page(root_id)
+            root_level = len(root.get('ancestors', []))
+            self.frontier.set_root_level(root_level)
+            self.frontier.add([(root_id, 0, "ROOT")])
+            yield root, 0, "ROOT"
+        if not recursive or max_depth == 0: return
+
+        resume = self.frontier.listing_resume_point()
+        if resume is None: return  # Listing finished in an earlier attempt
+        seq, start_url = resume
+        if start_url: logger.info(f"↩️ Resuming descendant listing of {root_id} at result page {seq}")
+
+        yielded = set()
+        results = asyncio.Queue(maxsize=2)
+        producer = asyncio.create_task(self._produce_descendants(root_id, seq, start_url, results))
+        try:
+            while True:
+                item = await results.get()
+                if item is _DONE: break
+                if isinstance(item, Exception): raise item
+                seq, url, pages, next_url = item
+
+                in_scope = []
+                for page in pages:
+                    ancestors = page.get('ancestors', [])
+                    depth = len(ancestors) - root_level
+                    # CQL can't bound depth, so deeper pages are filtered here
+                    if max_depth != -1 and depth > max_depth: continue
+                    in_scope.append((page, depth, ancestors[-1]['title'] if ancestors else "ROOT"))
+                self.frontier.record_listing(seq, url, next_url)
+                self.frontier.add([(page['id'], depth, parent) for page, depth, parent in in_scope], listing_seq=seq)
+
+                for page, depth, parent in in_scope:
+                    # Listings can repeat a page (re-listed on resume, or shifted by concurrent edits)
+                    if page['id'] in yielded or self.frontier.is_done(page['id']): continue
+                    yielded.add(page['id'])
+                    yield page, depth, parent
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def _produce_descendants(self, root_id, seq, start_url, results):
+        try:
+            async for url, pages, next_url in self.client.iter_descendants(root_id, start_url):
+                await results.put((seq, url, pages, next_url))
+                seq += 1
+            await results.put(_DONE)
+        except Exception as e:
+            logger.error(f"❌ Failed to list descendants of {root_id}: {e}")
+            await results.put(e)
+
+    async def crawl_tree(self, root_id, recursive=True, max_depth=-1):
+        frontier = asyncio.Queue()
+        results = asyncio.Queue(maxsize=self.concurrency * 2)
+        seen = self.frontier.visited()
+        if not seen:
+            self.frontier.add([(root_id, 0, "ROOT")])
+            seen = {root_id}
+        pending = self.frontier.pending()
+        if not pending: return  # Every page was done in an earlier attempt
+        if len(seen) > 1: logger.info(f"↩️ Resuming crawl of {root_id}: {len(pending)} pending of {len(seen)} visited")
+        for item in pending:
+            frontier.put_nowait(item)
+
+        workers = [
+            asyncio.create_task(self._worker(frontier, results, seen, recursive, max_depth))
+            for _ in range(self.concurrency)
+        ]
+        closer = asyncio.create_task(self._close_when_drained(frontier, results))
+        try:
+            while True:
+                item = await results.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in [*workers, closer]:
+                task.cancel()
+            await asyncio.gather(*workers, closer, return_exceptions=True)
+
+    async def _worker(self, frontier, results, seen, recursive, max_depth):
+        while True:
+            page_id, depth, parent_title = await frontier.get()
+            try:
+                logger.debug(f"[{depth}] Fetching {page_id}")
+                data = await self.client.get_page_with_children(page_id)
+                # Enqueue children before task_done() so the frontier never looks drained early
+                if recursive and (max_depth == -1 or depth + 1 <= max_depth):
+                    children = data.get('children', {}).get('page', {}).get('results', [])
+                    new = [(c['id'], depth + 1, data['title']) for c in children if c['id'] not in seen]
+                    # Persisted before enqueueing, so a restart still knows about them
+                    self.frontier.add(new)
+                    for child in new:
+                        seen.add(child[0])
+                        frontier.put_nowait(child)
+                await results.put((data, depth, parent_title))
+            except Exception as e:
+                logger.error(f"❌ Failed to fetch {page_id}: {e}")
+                await results.put(e)
+            finally:
+                frontier.task_done()
+
+    async def _close_when_drained(self, frontier, results):
+        await frontier.join()
+        await results.put(_DONE)
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+from app.core.config import settings
+
+class FrontierStore:
+    """
+    Persisted crawl frontier per job, so a failed or interrupted crawl resumes where it stopped.
+    - crawl_frontier: every page the job has discovered (the visited set) and whether it is done
+    - crawl_listing: bulk mode CQL result pages, so listing restarts from the first unfinished one
+    - crawl_checkpoint: NDJSON offset and stats as of the last page whose chunks were written
+    """
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path or settings.STATE_DB_PATH), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                job_id TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                parent_title TEXT,
+                listing_seq INTEGER,
+                status TEXT NOT NULL DEFAULT 'pending',
+                PRIMARY KEY (job_id, page_id)
+            );
+            CREATE TABLE IF NOT EXISTS crawl_listing (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                next_url TEXT,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS crawl_checkpoint (
+                job_id TEXT PRIMARY KEY,
+                chunks_offset INTEGER NOT NULL DEFAULT 0,
+                root_level INTEGER,
+                stats TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def for_job(self, job_id):
+        return JobFrontier(self, job_id)
+
+class JobFrontier:
+    """One job's view of the FrontierStore. Pages are only ever added once (cycle protection)."""
+    def __init__(self, store, job_id):
+        self.store = store
+        self.conn = store.conn
+        self._lock = store._lock
+        self.job_id = job_id
+
+    def visited(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT page_id FROM crawl_frontier WHERE job_id=?", (self.job_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def pending(self):
+        """Discovered but not done: (page_id, depth, parent_title), shallowest first."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT page_id, depth, parent_title FROM crawl_frontier WHERE job_id=? AND status!='done' ORDER BY depth",
+                (self.job_id,),
+            ).fetchall()
+
+    def is_done(self, page_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status FROM crawl_frontier WHERE job_id=? AND page_id=?", (self.job_id, page_id)
+            ).fetchone()
+        return bool(row) and row[0] == "done"
+
+    def add(self, pages, listing_seq=None):
+        """Record discovered (page_id, depth, parent_title); already visited pages are left as they are."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO crawl_frontier (job_id, page_id, depth, parent_title, listing_seq) VALUES (?, ?, ?, ?, ?)",
+                [(self.job_id, page_id, depth, parent_title, listing_seq) for page_id, depth, parent_title in pages],
+            )
+
+    def checkpoint(self, chunks_offset, stats, page_id=None):
+        """Output up to chunks_offset is durable; page_id (if given) is done, in the same transaction."""
+        with self._lock, self.conn:
+            if page_id is not None:
+                self.conn.execute(
+                    "UPDATE crawl_frontier SET status='done' WHERE job_id=? AND page_id=?", (self.job_id, page_id)
+                )
+            self.conn.execute("""
+                INSERT INTO crawl_checkpoint (job_id, chunks_offset, stats) VALUES (?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET chunks_offset=excluded.chunks_offset, stats=excluded.stats
+            """, (self.job_id, chunks_offset, json.dumps(stats)))
+
+    def _checkpoint_row(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT chunks_offset, root_level, stats FROM crawl_checkpoint WHERE job_id=?", (self.job_id,)
+            ).fetchone()
+
+    def chunks_offset(self):
+        row = self._checkpoint_row()
+        return row[0] if row else 0
+
+    def stats(self):
+        row = self._checkpoint_row()
+        return json.loads(row[2]) if row and row[2] else None
+
+    def root_level(self):
+        row = self._checkpoint_row()
+        return row[1] if row else None
+
+    def set_root_level(self, level):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO crawl_checkpoint (job_id, root_level) VALUES (?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET root_level=excluded.root_level
+            """, (self.job_id, level))
+
+    def record_listing(self, seq, url, next_url):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_listing (job_id, seq, url, next_url) VALUES (?, ?, ?, ?)",
+                (self.job_id, seq, url, next_url),
+            )
+
+    def listing_resume_point(self):
+        """
+        (seq, url) to restart bulk listing from, or None when the listing already finished.
+        Restarts at the earliest result page that still has unfinished pages; with none,
+        continues after the last recorded result page. (0, None) means start from scratch.
+        """
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT l.seq, l.url FROM crawl_listing l JOIN crawl_frontier f
+                  ON f.job_id=l.job_id AND f.listing_seq=l.seq
+                WHERE l.job_id=? AND f.status!='done' ORDER BY l.seq LIMIT 1
+            """, (self.job_id,)).fetchone()
+            if row: return row[0], row[1]
+            row = self.conn.execute(
+                "SELECT seq, next_url FROM crawl_listing WHERE job_id=? ORDER BY seq DESC LIMIT 1", (self.job_id,)
+            ).fetchone()
+        if not row: return 0, None
+        return (row[0] + 1, row[1]) if row[1] else None
+
+    def clear(self):
+        """Drop the job's frontier once it completed; nothing is left to resume."""
+        with self._lock, self.conn:
+            for table in ("crawl_frontier", "crawl_listing", "crawl_checkpoint"):
+                self.conn.execute(f"DELETE FROM {table} WHERE job_id=?", (self.job_id,))
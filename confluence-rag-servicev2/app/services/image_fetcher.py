@@ -0,0 +1,121 @@
+import time
+import uuid
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import mimetypes
+import threading
+from urllib.parse import urlparse
+from pathlib import Path, PurePosixPath
+from app.core.config import settings
+
+logger = logging.getLogger("image_fetcher")
+
+class ImageCacheIndex:
+    """URL -> (ETag, Last-Modified, content hash) so re-runs can send conditional requests."""
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path or settings.STATE_DB_PATH), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS image_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                path TEXT NOT NULL,
+                fetched_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, path FROM image_cache WHERE url=?", (url,)
+            ).fetchone()
+        if not row: return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "path": row[3]}
+
+    def put(self, url, etag, last_modified, digest, path):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO image_cache (url, etag, last_modified, content_hash, path, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, digest, str(path), time.time()),
+            )
+
+class ImageFetcher:
+    """
+    Concurrent image download stage keyed by the resolved attachment URL.
+    - Same URL on many pages: fetched once per run (in-flight requests are shared)
+    - Known URL: conditional request (If-None-Match / If-Modified-Since), 304 reuses the file
+    - Storage is content-addressed, so identical bytes under different URLs are stored once
+    """
+    def __init__(self, client, index=None, concurrency=None):
+        self.client = client
+        self.index = index or ImageCacheIndex()
+        self.store_dir = settings.OUTPUT_DIR / "images" / "objects"
+        self.semaphore = asyncio.Semaphore(concurrency or settings.IMAGE_FETCH_CONCURRENCY)
+        self._tasks = {}
+        self.stats = {"downloaded": 0, "not_modified": 0, "deduplicated": 0, "failed": 0}
+
+    async def fetch_all(self, images):
+        """Resolve every image chunk to a stored file, updating local_path/content_hash in place."""
+        results = await asyncio.gather(*(self.fetch(img['image_url']) for img in images), return_exceptions=True)
+        for img, result in zip(images, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Image download failed for {img['image_url']}: {result}")
+                img['local_path'] = None
+                img['content_hash'] = None
+                continue
+            img['local_path'] = result['path']
+            img['content_hash'] = result['content_hash']
+
+    def fetch(self, url):
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._tasks[url] = task
+        else:
+            self.stats["deduplicated"] += 1
+        return task
+
+    async def _fetch(self, url):
+        async with self.semaphore:
+            cached = self.index.get(url)
+            headers = {}
+            if cached and Path(cached['path']).exists():
+                if cached['etag']: headers["If-None-Match"] = cached['etag']
+                if cached['last_modified']: headers["If-Modified-Since"] = cached['last_modified']
+            try:
+                resp = await self.client.request("GET", url, headers=headers, ok_statuses=(304,))
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+
+            if resp.status_code == 304:
+                self.stats["not_modified"] += 1
+                return cached
+
+            digest = hashlib.sha256(resp.content).hexdigest()
+            path = self._object_path(digest, url, resp.headers.get("Content-Type"))
+            if not path.exists():
+                await asyncio.to_thread(self._write, path, resp.content)
+            self.index.put(url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), digest, path)
+            self.stats["downloaded"] += 1
+            return {"path": str(path), "content_hash": digest}
+
+    def _object_path(self, digest, url, content_type):
+        ext = PurePosixPath(urlparse(url).path).suffix.lower()
+        if not ext and content_type:
+            ext = mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+        return self.store_dir / digest[:2] / f"{digest}{ext}"
+
+    @staticmethod
+    def _write(path, content):
+        # Write-then-rename so a crash never leaves a truncated object behind
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+        tmp.write_bytes(content)
+        tmp.replace(path)
@@ -0,0 +1,156 @@
+import json
+import logging
+import httpx
+from pathlib import Path
+from app.core.config import settings
+
+logger = logging.getLogger("indexer")
+
+class VectorIndexer:
+    """
+    Embeds chunks and bulk-upserts them into the main API's Chroma collection.
+    Chunk IDs are deterministic (text chunks: page ID + content hash; image chunks: page, source
+    and occurrence, so the marker in the page text stays stable), so:
+    - IDs already in the collection with the same stored text are unchanged content: metadata is
+      refreshed, nothing is re-embedded; an image whose description or context changed is re-embedded
+    - re-running a sync (or a resumed job) upserts the same IDs instead of adding duplicates
+    Embedding requests are packed by token count, not chunk count.
+    With CHROMA_WRITER_URL set, writes go through the main API's single-writer service.
+    """
+    def __init__(self):
+        # Heavy clients are only imported when indexing is actually enabled
+        import chromadb
+        import tiktoken
+        from chromadb.config import Settings as ChromaSettings
+        from openai import OpenAI
+
+        self.model = settings.OPENAI_EMBEDDING_MODEL
+        self.openai = OpenAI(api_key=settings.OPENAI_API_KEY)
+        try:
+            self.encoding = tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIR, settings=ChromaSettings(anonymized_telemetry=False))
+        self.upsert_batch_size = min(settings.CHROMA_UPSERT_BATCH_SIZE, self.client.get_max_batch_size())
+        self.writer = httpx.Client(base_url=settings.CHROMA_WRITER_URL.rstrip('/'), timeout=120) if settings.CHROMA_WRITER_URL else None
+
+    def _write(self, collection, op, **payload):
+        if self.writer is None:
+            return getattr(collection, op)(**payload)
+        # The writer resolves the live collection itself (collection None)
+        resp = self.writer.post("/writes", json={"op": op, "collection": None, **payload})
+        resp.raise_for_status()
+
+    def _collection(self):
+        """Live collection, following the main API's reindex alias (re-read per batch, so a switch mid-job is picked up)."""
+        alias = Path(settings.CHROMA_PERSIST_DIR) / "collection_alias.json"
+        name = json.loads(alias.read_text())["collection"] if alias.exists() else settings.CHROMA_COLLECTION_NAME
+        return self.client.get_or_create_collection(name=name)
+
+    def sync(self, docs, delete_ids=()):
+        """
+        docs: [(chunk_id, text, metadata)]. delete_ids: chunk IDs that no longer exist.
+        Returns counters for the job stats.
+        """
+        counts = {"embedded": 0, "reused": 0, "deleted": 0, "tokens": 0}
+        collection = self._collection()
+        if delete_ids:
+            delete_ids = list(delete_ids)
+            for i in range(0, len(delete_ids), self.upsert_batch_size):
+                self._write(collection, "delete", ids=delete_ids[i:i + self.upsert_batch_size])
+            counts["deleted"] = len(delete_ids)
+        if not docs: return counts
+
+        # Stored texts are the truncated ones; compare like with like
+        docs = [(chunk_id, self._fit(chunk_id, text), metadata) for chunk_id, text, metadata in docs]
+        # Image chunk IDs don't change with their text, so compare the stored text too
+        stored = collection.get(ids=[d[0] for d in docs], include=["documents"])
+        existing = dict(zip(stored["ids"], stored["documents"]))
+        reused = [d for d in docs if d[0] in existing and existing[d[0]] == d[1]]
+        new = [d for d in docs if not (d[0] in existing and existing[d[0]] == d[1])]
+        for i in range(0, len(reused), self.upsert_batch_size):
+            batch = reused[i:i + self.upsert_batch_size]
+            self._write(collection, "update", ids=[d[0] for d in batch], metadatas=[d[2] for d in batch])
+        counts["reused"] = len(reused)
+
+        for batch, tokens in self._token_batches(new):
+            response = self.openai.embeddings.create(model=self.model, input=[text for _, text, _ in batch])
+            embeddings = [d.embedding for d in response.data]
+            for i in range(0, len(batch), self.upsert_batch_size):
+                part = batch[i:i + self.upsert_batch_size]
+                self._write(
+                    collection, "upsert",
+                    ids=[d[0] for d in part],
+                    documents=[d[1] for d in part],
+                    metadatas=[d[2] for d in part],
+                    embeddings=embeddings[i:i + self.upsert_batch_size],
+                )
+            counts["embedded"] += len(batch)
+            counts["tokens"] += tokens
+        return counts
+
+    def _fit(self, chunk_id, text):
+        """Text as embedded and stored: over-long inputs are truncated to EMBED_MAX_INPUT_TOKENS."""
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= settings.EMBED_MAX_INPUT_TOKENS:
+            return text
+        logger.warning(f"⚠️ Chunk {chunk_id} has {len(tokens)} tokens, truncating for embedding")
+        return self.encoding.decode(tokens[:settings.EMBED_MAX_INPUT_TOKENS])
+
+    def _token_batches(self, docs):
+        """Yield (batch, tokens) under the per-request token and input limits (texts already fitted)."""
+        batch, batch_tokens = [], 0
+        for chunk_id, text, metadata in docs:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if batch and (batch_tokens + len(tokens) > settings.EMBED_BATCH_TOKENS or len(batch) >= settings.EMBED_BATCH_MAX_INPUTS):
+                yield batch, batch_tokens
+                batch, batch_tokens = [], 0
+            batch.append((chunk_id, text, metadata))
+            batch_tokens += len(tokens)
+        if batch:
+            yield batch, batch_tokens
+
+def chunk_document(chunk):
+    """
+    (chunk_id, text, metadata) for a pipeline chunk, or None if there is nothing to embed.
+    Metadata follows the main API's DocumentMetadata schema (flat scalars only),
+    plus Confluence-specific keys, so its search and listing endpoints work unchanged.
+    """
+    page = chunk['page_metadata']
+    base = {
+        "filename": page['page_title'],
+        "document_id": f"confluence-{page['page_id']}",
+        "category": settings.CONFLUENCE_CATEGORY,
+        "subcategory": page.get('space_key', ""),
+        "page_numbers": "",
+        "title": page['page_title'],
+        "source_path": page['page_url'],
+        "table_count": 0,
+        "source": "confluence",
+        "chunk_type": chunk['chunk_type'],
+        "page_id": page['page_id'],
+        "parent_title": page['parent_title'],
+        "page_depth": page['page_depth'],
+    }
+    if chunk['chunk_type'] == "text":
+        text = chunk['content']
+        refs = chunk['all_image_refs']
+        metadata = {**base, "has_images": bool(refs), "image_count": len(refs),
+                    "image_references": ",".join(refs), "image_descriptions": "", "figure_captions": ""}
+    else:
+        text = chunk.get('llm_description') or chunk['context_text']
+        metadata = {**base, "has_images": True, "image_count": 1,
+                    "image_references": chunk.get('local_path') or chunk['image_url'],
+                    "image_descriptions": chunk.get('llm_description') or "",
+                    "figure_captions": chunk['context_text'],
+                    "image_url": chunk['image_url'], "content_hash": chunk.get('content_hash') or ""}
+    if not text.strip(): return None
+    return chunk['chunk_id'], text, metadata
+
+def create_indexer():
+    """VectorIndexer if indexing is enabled and configured, else None (chunks are only streamed)."""
+    if not settings.INDEX_ENABLED: return None
+    if not settings.OPENAI_API_KEY:
+        logger.warning("⚠️ INDEX_ENABLED but OPENAI_API_KEY is not set; chunks will not be indexed")
+        return None
+    return VectorIndexer()
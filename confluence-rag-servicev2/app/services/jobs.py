@@ -0,0 +1,139 @@
+import json
+import time
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+from app.services.frontier import FrontierStore
+from app.services.pipeline import RAGPipeline
+
+logger = logging.getLogger("jobs")
+
+FINISHED = ("completed", "failed", "interrupted")
+RESUMABLE = ("failed", "interrupted")
+
+class JobSink:
+    """
+    Where a running pipeline sends its output.
+    Chunks are appended to the job's NDJSON file as each page finishes,
+    so memory stays bounded and readers can tail the file.
+    Every emit is checkpointed in the job's frontier together with the page it finishes.
+    """
+    def __init__(self, manager, job_id, frontier):
+        self.manager = manager
+        self.job_id = job_id
+        self.frontier = frontier
+        self._lock = threading.Lock()
+        self.file = open(manager.chunks_path(job_id), "ab")
+
+    def emit(self, records, page_id=None, stats=None):
+        """Append records; page_id (may have no records) is then done as of this offset."""
+        with self._lock:
+            for record in records:
+                self.file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.file.flush()
+            self.frontier.checkpoint(self.file.tell(), stats, page_id)
+
+    def progress(self, stats):
+        self.manager.update(self.job_id, stats=stats)
+
+    def close(self):
+        self.file.close()
+
+class JobManager:
+    """
+    Runs crawls as background jobs on a small thread pool.
+    Job metadata (never credentials) is persisted next to the chunk stream;
+    the crawl frontier is persisted in the state DB so failed jobs can resume.
+    """
+    def __init__(self):
+        self.dir = settings.OUTPUT_DIR / "jobs"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.executor = ThreadPoolExecutor(max_workers=settings.MAX_CONCURRENT_JOBS, thread_name_prefix="crawl-job")
+        self._lock = threading.Lock()
+        self.frontier = FrontierStore()
+        self._mark_stale_jobs()
+
+    def meta_path(self, job_id):
+        return self.dir / f"{job_id}.json"
+
+    def chunks_path(self, job_id):
+        return self.dir / f"{job_id}.ndjson"
+
+    def submit(self, req):
+        job_id = uuid.uuid4().hex
+        self._write(job_id, {
+            "job_id": job_id,
+            "status": "queued",
+            "url": req.url,
+            "recursive": req.recursive,
+            "max_depth": req.max_depth,
+            "full_resync": req.full_resync,
+            "traversal": req.traversal,
+            "created_at": time.time(),
+            "stats": {},
+            "error": None,
+        })
+        self.chunks_path(job_id).touch()
+        self.executor.submit(self._run, job_id, req)
+        return self.get(job_id)
+
+    def get(self, job_id):
+        path = self.meta_path(job_id)
+        if not path.exists(): return None
+        return json.loads(path.read_text())
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            meta = self.get(job_id)
+            meta.update(fields)
+            self._write(job_id, meta)
+        return meta
+
+    def resume(self, job_id, req):
+        """
+        Restart a failed/interrupted job from its frontier. req carries fresh credentials.
+        Output written after the last checkpoint is truncated, since those pages run again.
+        Returns None if the job doesn't exist, raises ValueError if it isn't resumable.
+        """
+        with self._lock:
+            meta = self.get(job_id)
+            if meta is None: return None
+            if meta["status"] not in RESUMABLE:
+                raise ValueError(f"Job is {meta['status']}, only {' or '.join(RESUMABLE)} jobs can be resumed")
+            with open(self.chunks_path(job_id), "r+b") as f:
+                f.truncate(self.frontier.for_job(job_id).chunks_offset())
+            meta.update(status="queued", error=None, attempts=meta.get("attempts", 1) + 1)
+            self._write(job_id, meta)
+        self.executor.submit(self._run, job_id, req)
+        return meta
+
+    def _run(self, job_id, req):
+        self.update(job_id, status="running", started_at=time.time())
+        frontier = self.frontier.for_job(job_id)
+        sink = JobSink(self, job_id, frontier)
+        try:
+            stats = RAGPipeline(req, frontier=frontier).run(sink)
+            frontier.clear()
+            self.update(job_id, status="completed", stats=stats, finished_at=time.time())
+            print(f"✅ Job {job_id} completed: {stats}")
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}", exc_info=True)
+            self.update(job_id, status="failed", error=str(e), finished_at=time.time())
+        finally:
+            sink.close()
+
+    def _write(self, job_id, meta):
+        # Atomic replace so readers never see a half-written file
+        tmp = self.meta_path(job_id).with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta))
+        tmp.replace(self.meta_path(job_id))
+
+    def _mark_stale_jobs(self):
+        """Jobs left running by a previous process can't still be running."""
+        for path in self.dir.glob("*.json"):
+            meta = json.loads(path.read_text())
+            if meta.get("status") not in FINISHED:
+                meta["status"] = "interrupted"
+                self._write(meta["job_id"], meta)
@@ -1,96 +1,207 @@
 import re
+import asyncio
+import hashlib
 import logging
 from app.core.config import settings
-from app.services.confluence import ConfluenceClient
-from app.utils.html_parser import HtmlProcessor
-from docling.document_converter import DocumentConverter
-from docling.datamodel.base_models import InputFormat
+from app.services.confluence import AsyncConfluenceClient
+from app.services.crawler import ConfluenceCrawler
+from app.services.frontier import FrontierStore
+from app.services.converter_pool import get_converter_pool
+from app.services.image_fetcher import ImageFetcher
+from app.services.indexer import create_indexer, chunk_document
+from app.services.sync_state import SyncStateStore, content_hash
+from app.utils.html_parser import create_html_processor
 
 logger = logging.getLogger("pipeline")
 
+IMG_MARKER = re.compile(r'\[\[IMG:(image_[a-f0-9]+)\]\]')
+
 class RAGPipeline:
-    def __init__(self, req):
+    def __init__(self, req, transport=None, frontier=None):
         self.req = req
-        self.client = ConfluenceClient(req.url, req.username, req.token)
-        self.converter = DocumentConverter(allowed_formats=[InputFormat.HTML])
+        self.transport = transport  # httpx transport override, e.g. a fake Confluence app
+        # Persisted per job by JobManager; a fresh in-memory one means no resume
+        self.frontier = frontier or FrontierStore(":memory:").for_job("local")
+        self.converter = get_converter_pool()
+        self.state = SyncStateStore()
+
+    def run(self, sink):
+        """Crawl and process the tree, streaming each page's output to sink. Returns stats."""
+        return asyncio.run(self.run_async(sink))
 
-    def run(self):
+    async def run_async(self, sink):
         # 1. Root ID Extraction
         base_url = f"{self.req.url.split('/wiki/')[0]}/wiki"
         match = re.search(r'pages/(\d+)', self.req.url)
         if not match: raise ValueError("Invalid Confluence URL")
         root_id = match.group(1)
-        
-        # 2. Stack-Based Traversal (Handles max_depth=-1)
-        # Tuple: (page_id, depth, parent_title) -> Metadata Requirement
-        stack = [(root_id, 0, "ROOT")] 
-        all_chunks = []
-        processed_pages = 0
-        
-        print(f"🚀 Starting Traversal (Recursive={self.req.recursive}, Depth={self.req.max_depth})")
-        
-        while stack:
-            page_id, depth, parent_title = stack.pop(0)
-            
-            # Check Depth
-            if self.req.max_depth != -1 and depth > self.req.max_depth:
-                continue
-                
-            # A. Fetch (1 API Call)
-            print(f"📄 [{depth}] Processing {page_id}...")
-            data = self.client.get_page_with_children(page_id)
-            if not data: continue
-            
-            title = data['title']
-            space_key = data.get('space', {}).get('key', 'UNKNOWN')
-            page_url = f"{base_url}/spaces/{space_key}/pages/{page_id}"
-            
-            # B. Process HTML & Images
-            processor = HtmlProcessor(base_url)
-            clean_html = processor.process(data['body']['storage']['value'], page_id, title)
-            
-            # C. Docling Chunking
-            page_chunks = self._chunk_content(clean_html, processor.images, page_id, title, page_url, depth, parent_title)
-            all_chunks.extend(page_chunks)
-            processed_pages += 1
-            
-            # D. Handle Children
-            if self.req.recursive:
-                children = data.get('children', {}).get('page', {}).get('results', [])
-                print(f"  📂 Found {len(children)} children")
-                for child in children:
-                    # Pass current title as parent_title to children
-                    stack.append((child['id'], depth + 1, title))
-        
+
+        self.root_id = root_id
+        self.sink = sink
+        self.stats = {"total_chunks": 0, "pages_processed": 0, "pages_unchanged": 0, "pages_failed": 0, "pages_deleted": 0, "removed_chunks": 0}
+        # Resumed job: carry on from the stats of the last checkpoint
+        self.stats.update(self.frontier.stats() or {})
+        self.stats.setdefault("indexed", {"embedded": 0, "reused": 0, "deleted": 0, "tokens": 0})
+        self.indexer = await asyncio.to_thread(create_indexer)
+
+        print(f"🚀 Starting Traversal (Recursive={self.req.recursive}, Depth={self.req.max_depth}, Fetchers={settings.CRAWL_CONCURRENCY})")
+
+        # 2. Concurrent Traversal (Handles max_depth=-1)
+        # Fetchers run ahead on the event loop; changed pages are batched into
+        # the converter pool, with a bounded number of batches in flight
+        async with AsyncConfluenceClient(base_url, self.req.username, self.req.token, transport=self.transport) as client:
+            crawler = ConfluenceCrawler(client, frontier=self.frontier)
+            self.fetcher = ImageFetcher(client)
+            batch, inflight = [], set()
+            max_inflight = self.converter.workers * 2
+
+            async for data, depth, parent_title in crawler.crawl(root_id, self.req.recursive, self.req.max_depth, self.req.traversal):
+                page = await self._prepare_page(data, depth, parent_title, base_url)
+                if page is None:
+                    self.stats["pages_unchanged"] += 1
+                    await asyncio.to_thread(sink.emit, [], data['id'], self._checkpoint_stats())
+                    self._progress()
+                    continue
+
+                batch.append(page)
+                if len(batch) >= settings.CONVERT_BATCH_SIZE:
+                    inflight.add(asyncio.create_task(self._finish_batch(batch)))
+                    batch = []
+                    if len(inflight) >= max_inflight:
+                        done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done: task.result()  # Surface failures
+
+            if batch:
+                inflight.add(asyncio.create_task(self._finish_batch(batch)))
+            await asyncio.gather(*inflight)
+
+        # 3. Tombstones (crawl completed, so anything unseen in scope is gone)
+        # The frontier's visited set spans every attempt of a resumed job
+        deleted = self.state.tombstone_missing(root_id, self.frontier.visited(), self.req.recursive, self.req.max_depth)
+        await self._index([], [cid for _, chunk_ids in deleted for cid in chunk_ids])
+        for page_id, chunk_ids in deleted:
+            print(f"🪦 Page {page_id} deleted ({len(chunk_ids)} chunks)")
+            self.stats["removed_chunks"] += len(chunk_ids)
+        self.stats["pages_deleted"] = len(deleted)
+        sink.emit([self._tombstone(page_id, chunk_ids, page_deleted=True) for page_id, chunk_ids in deleted], stats=self._checkpoint_stats())
+        self.stats["images"] = self.fetcher.stats
+        self.stats["api_calls"] = client.api_calls
+
+        return self.stats
+
+    @staticmethod
+    def _tombstone(page_id, chunk_ids, page_deleted=False):
+        """Stream record telling consumers to drop chunks that no longer exist."""
+        return {"chunk_type": "tombstone", "page_id": page_id, "page_deleted": page_deleted, "chunk_ids": chunk_ids}
+
+    def _progress(self):
+        self.sink.progress({**self.stats, "images": self.fetcher.stats})
+
+    def _checkpoint_stats(self):
+        # Per-attempt counters (images, api_calls) aren't carried across a resume
+        return {k: v for k, v in self.stats.items() if k not in ("images", "api_calls")}
+
+    async def _prepare_page(self, data, depth, parent_title, base_url):
+        """
+        Skip the page if its version and content are unchanged since the last sync.
+        Otherwise preprocess its HTML and start its image downloads; returns the page context.
+        """
+        page_id = data['id']
+        version = data.get('version', {})
+        body = data['body']['storage']['value']
+        digest = content_hash(body)
+        if not self.req.full_resync and self.state.is_unchanged(self.root_id, page_id, version.get('number'), digest):
+            self.state.touch(self.root_id, page_id, depth)
+            return None
+
+        title = data['title']
+        space_key = data.get('space', {}).get('key', 'UNKNOWN')
+        print(f"📄 [{depth}] Processing {page_id}...")
+
+        # A. Process HTML & Images (downloads overlap with conversion)
+        processor = create_html_processor(base_url)
+        clean_html = await asyncio.to_thread(processor.process, body, page_id, title)
         return {
-            "total_chunks": len(all_chunks),
-            "pages_processed": processed_pages,
-            "chunks": all_chunks
+            "page_id": page_id,
+            "title": title,
+            "url": f"{base_url}/spaces/{space_key}/pages/{page_id}",
+            "space_key": space_key,
+            "depth": depth,
+            "parent_title": parent_title,
+            "html": clean_html,
+            "images": processor.images,
+            "images_ready": asyncio.ensure_future(self.fetcher.fetch_all(processor.images)),
+            "version": version,
+            "digest": digest,
+            "previous": self.state.get(self.root_id, page_id),
         }
 
-    def _chunk_content(self, html, images, page_id, title, url, depth, parent_title):
-        # Save temp HTML (Docling requirement)
-        temp_path = settings.OUTPUT_DIR / "html" / f"{page_id}.html"
-        temp_path.write_text(html, encoding="utf-8")
-        
-        # Docling Conversion
-        doc = self.converter.convert(temp_path).document
-        
+    async def _index(self, chunks, delete_ids):
+        if self.indexer is None: return
+        docs = [doc for doc in map(chunk_document, chunks) if doc]
+        counts = await asyncio.to_thread(self.indexer.sync, docs, delete_ids)
+        for key, value in counts.items():
+            self.stats["indexed"][key] += value
+
+    async def _finish_batch(self, pages):
+        # B. Docling Conversion (in memory, one convert_all per batch)
+        texts_by_page = await self.converter.convert([(p['page_id'], p['html']) for p in pages])
+
+        finished = []
+        for page in pages:
+            await page['images_ready']
+            texts = texts_by_page.get(page['page_id'])
+            if texts is None:
+                # Not recorded in sync state, so the next sync retries it (but this job moves on)
+                self.stats["pages_failed"] += 1
+                await asyncio.to_thread(self.sink.emit, [], page['page_id'], self._checkpoint_stats())
+                continue
+
+            chunks = self._chunk_content(texts, page['images'], page['page_id'], page['title'], page['url'], page['depth'], page['parent_title'], page['space_key'])
+            chunk_ids = [c['chunk_id'] for c in chunks]
+            previous = page['previous']
+            stale_ids = sorted(set(previous['chunk_ids']) - set(chunk_ids)) if previous else []
+            finished.append((page, chunks, chunk_ids, stale_ids))
+
+        # C. Embed + upsert the whole batch at once (before checkpointing, so a crash re-indexes idempotently)
+        await self._index([c for _, chunks, _, _ in finished for c in chunks],
+                          [cid for _, _, _, stale_ids in finished for cid in stale_ids])
+
+        for page, chunks, chunk_ids, stale_ids in finished:
+            records = list(chunks)
+            if stale_ids:
+                records.append(self._tombstone(page['page_id'], stale_ids))
+            self.stats["total_chunks"] += len(chunks)
+            self.stats["removed_chunks"] += len(stale_ids)
+            self.stats["pages_processed"] += 1
+            # Chunks are checkpointed (page done) before sync state moves on: a crash in
+            # between reprocesses the page on the next sync rather than losing its chunks
+            await asyncio.to_thread(self.sink.emit, records, page['page_id'], self._checkpoint_stats())
+            self.state.record(self.root_id, page['page_id'], page['version'].get('number'), page['version'].get('when'),
+                              page['digest'], chunk_ids, page['depth'])
+            self._progress()
+
+    def _chunk_content(self, texts, images, page_id, title, url, depth, parent_title, space_key):
         final_chunks = []
-        
+        images_by_id = {img['chunk_id']: img for img in images}
+        occurrences = {}
+
         # 1. Text Chunks
-        for item, level in doc.iterate_items():
-            text = item.text.strip()
+        for text in texts:
+            text = text.strip()
             if not text: continue
-            
+
             # Detect Markers [[IMG:ID]]
-            img_refs = re.findall(r'\[\[IMG:(image_[a-f0-9]+)\]\]', text)
-            clean_text = re.sub(r'\[\[IMG:image_[a-f0-9]+\]\]', '', text).strip()
-            
+            img_refs = IMG_MARKER.findall(text)
+            clean_text = IMG_MARKER.sub('', text).strip()
+
             if not clean_text and not img_refs: continue
-            
-            chunk_id = f"text_{len(final_chunks)}_{page_id}"
-            
+
+            # Page ID + content hash: unchanged chunks keep their ID across edits and re-syncs
+            digest = hashlib.sha256("\0".join([clean_text, *img_refs]).encode("utf-8")).hexdigest()[:16]
+            n = occurrences[digest] = occurrences.get(digest, -1) + 1
+            chunk_id = f"text_{page_id}_{digest}" + (f"_{n}" if n else "")
+
             # EXACT Metadata Schema from test.py
             final_chunks.append({
                 "chunk_type": "text",
@@ -104,27 +215,27 @@ class RAGPipeline:
                     "parent_title": parent_title,
                     "page_url": url,
                     "page_depth": depth,
+                    "space_key": space_key,
                     "char_count": len(clean_text)
                 }
             })
-            
+
             # Bidirectional Link Backfill
             for ref in img_refs:
-                for img in images:
-                    if img['chunk_id'] == ref:
-                        img['text_refs'].append(chunk_id)
+                img = images_by_id.get(ref)
+                if img: img['text_refs'].append(chunk_id)
 
-        # 2. Image Chunks (Download & Finalize)
+        # 2. Image Chunks (downloaded by the ImageFetcher stage)
         for img in images:
-            self.client.download_image(img['image_url'], img['local_path'])
             # Add Page Metadata to Image Chunk too
             img['page_metadata'] = {
                 "page_id": page_id,
                 "page_title": title,
                 "parent_title": parent_title,
                 "page_url": url,
-                "page_depth": depth
+                "page_depth": depth,
+                "space_key": space_key
             }
             final_chunks.append(img)
-            
-        return final_chunks
\ No newline at end of file
+
+        return final_chunks
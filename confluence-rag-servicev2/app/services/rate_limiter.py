@@ -0,0 +1,59 @@
+import time
+import asyncio
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger("rate_limiter")
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all crawler workers.
+    - 429: every worker pauses until Retry-After, rate is halved
+    - Slow responses: rate backs off gently
+    - Fast responses: rate creeps back up (AIMD)
+    """
+    def __init__(self, rate=None, burst=None, min_rate=None, max_rate=None, target_latency=None):
+        self.rate = rate or settings.RATE_LIMIT_RPS
+        self.burst = burst or settings.RATE_LIMIT_BURST
+        self.min_rate = min_rate or settings.RATE_LIMIT_MIN_RPS
+        self.max_rate = max_rate or settings.RATE_LIMIT_MAX_RPS
+        self.target_latency = target_latency or settings.RATE_LIMIT_TARGET_LATENCY
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Lock keeps waiters FIFO; a pause set while sleeping is re-checked on wake
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Called on 429: stop all workers and halve the rate."""
+        now = time.monotonic()
+        # In-flight requests of one burst all see 429; only halve once per pause
+        if now >= self.paused_until:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until  # No tokens accrue while paused
+        logger.warning(f"⏸️ Pausing all fetchers for {seconds:.1f}s (rate now {self.rate:.2f}/s)")
+
+    def record_latency(self, latency):
+        if latency > self.target_latency:
+            self.rate = max(self.min_rate, self.rate * 0.9)
+        else:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
@@ -0,0 +1,92 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from app.core.config import settings
+
+def content_hash(html):
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+class SyncStateStore:
+    """
+    Per-page sync state, scoped by root page so separate trees don't interfere.
+    Lets a re-sync skip unchanged pages and tombstone pages that disappeared.
+    """
+    def __init__(self, path=None):
+        self.path = path or settings.STATE_DB_PATH
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_state (
+                root_id TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                version INTEGER,
+                last_modified TEXT,
+                content_hash TEXT,
+                chunk_ids TEXT NOT NULL DEFAULT '[]',
+                depth INTEGER,
+                status TEXT NOT NULL DEFAULT 'active',
+                synced_at REAL,
+                PRIMARY KEY (root_id, page_id)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, root_id, page_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT version, last_modified, content_hash, chunk_ids, status FROM page_state WHERE root_id=? AND page_id=?",
+                (root_id, page_id),
+            ).fetchone()
+        if not row: return None
+        return {"version": row[0], "last_modified": row[1], "content_hash": row[2],
+                "chunk_ids": json.loads(row[3]), "status": row[4]}
+
+    def is_unchanged(self, root_id, page_id, version, digest):
+        state = self.get(root_id, page_id)
+        return bool(state) and state["status"] == "active" and state["version"] == version and state["content_hash"] == digest
+
+    def record(self, root_id, page_id, version, last_modified, digest, chunk_ids, depth):
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO page_state (root_id, page_id, version, last_modified, content_hash, chunk_ids, depth, status, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?)
+                ON CONFLICT (root_id, page_id) DO UPDATE SET
+                    version=excluded.version, last_modified=excluded.last_modified,
+                    content_hash=excluded.content_hash, chunk_ids=excluded.chunk_ids,
+                    depth=excluded.depth, status='active', synced_at=excluded.synced_at
+            """, (root_id, page_id, version, last_modified, digest, json.dumps(chunk_ids), depth, time.time()))
+
+    def touch(self, root_id, page_id, depth):
+        """Unchanged page seen again: keep its depth current for scope checks."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE page_state SET depth=?, synced_at=? WHERE root_id=? AND page_id=?",
+                (depth, time.time(), root_id, page_id),
+            )
+
+    def tombstone_missing(self, root_id, seen_ids, recursive=True, max_depth=-1):
+        """
+        Mark active pages not seen in a complete crawl as deleted.
+        Only pages inside the crawled scope are considered, so a shallow
+        re-sync never tombstones deeper pages it did not visit.
+        Returns [(page_id, chunk_ids)] of the newly deleted pages.
+        """
+        max_scope_depth = 0 if not recursive else max_depth
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT page_id, chunk_ids, depth FROM page_state WHERE root_id=? AND status='active'",
+                (root_id,),
+            ).fetchall()
+            deleted = [
+                (page_id, json.loads(chunk_ids)) for page_id, chunk_ids, depth in rows
+                if page_id not in seen_ids and (max_scope_depth == -1 or (depth or 0) <= max_scope_depth)
+            ]
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE page_state SET status='deleted', synced_at=? WHERE root_id=? AND page_id=?",
+                    [(time.time(), root_id, page_id) for page_id, _ in deleted],
+                )
+        return deleted
@@ -1,13 +1,30 @@
-import uuid
 import re
+import hashlib
+import lxml.html
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from app.core.config import settings
 
+CONTEXT_TAGS = ('p', 'div', 'span', 'h1', 'h2', 'li')
+PARENT_TAGS = ('figure', 'figcaption', 'div')
+
+def create_html_processor(base_url):
+    """HTML_ENGINE picks the implementation; both produce the same schema."""
+    if settings.HTML_ENGINE == "bs4":
+        return HtmlProcessor(base_url)
+    return LxmlHtmlProcessor(base_url)
+
 class HtmlProcessor:
     def __init__(self, base_url):
         self.base_url = base_url
         self.images = []
+        self._occurrences = {}
+
+    def _image_id(self, page_id, src):
+        """Deterministic per page and source, so re-syncs produce the same chunk IDs."""
+        n = self._occurrences.get(src, 0)
+        self._occurrences[src] = n + 1
+        return f"image_{hashlib.sha256(f'{page_id}:{src}:{n}'.encode()).hexdigest()[:16]}"
 
     def process(self, html_content, page_id, page_title):
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -18,30 +35,13 @@ class HtmlProcessor:
             if not src: continue
             
             # 1. Prepare Metadata
-            filename = f"img_{page_id}_{i:03d}.png"
-            full_url = urljoin(self.base_url, src)
-            chunk_id = f"image_{uuid.uuid4().hex[:8]}"
+            chunk_id = self._image_id(page_id, src)
             
             # 2. Extract Context (Ported from your test.py _get_image_context)
             context = self._get_image_context(img)
             
-            # 3. Build Image Chunk (Matching test.py schema)
-            self.images.append({
-                "chunk_type": "image",
-                "chunk_id": chunk_id,
-                "filename": filename,
-                "image_url": full_url,
-                "local_path": str(settings.OUTPUT_DIR / "images" / filename),
-                "context_text": context,
-                # The exact LLM prompt format from test.py
-                "llm_prompt": f'Describe this technical image/diagram in detail.\nContext from surrounding text: "{context[:150]}..."\nFocus on charts, diagrams, code, technical content.',
-                "llm_description": None,
-                "text_refs": [],
-                "metadata": {
-                    "page_id": page_id,
-                    "original_src": src
-                }
-            })
+            # 3. Build Image Chunk
+            self.images.append(self._image_chunk(chunk_id, src, i, page_id, context))
             
             # 4. Inject Marker (Upgrade from heuristic linking)
             # Replaces <img> with [[IMG:ID]] so Docling preserves location
@@ -49,20 +49,41 @@ class HtmlProcessor:
             
         return str(soup)
 
+    def _image_chunk(self, chunk_id, src, index, page_id, context):
+        """Image chunk matching the test.py schema."""
+        filename = f"img_{page_id}_{index:03d}.png"
+        full_url = urljoin(self.base_url, src)
+        return {
+            "chunk_type": "image",
+            "chunk_id": chunk_id,
+            "filename": filename,
+            "image_url": full_url,
+            "local_path": str(settings.OUTPUT_DIR / "images" / filename),
+            "context_text": context,
+            # The exact LLM prompt format from test.py
+            "llm_prompt": f'Describe this technical image/diagram in detail.\nContext from surrounding text: "{context[:150]}..."\nFocus on charts, diagrams, code, technical content.',
+            "llm_description": None,
+            "text_refs": [],
+            "metadata": {
+                "page_id": page_id,
+                "original_src": src
+            }
+            }
+
     def _get_image_context(self, img_tag) -> str:
         """Exact port of test.py logic"""
         context_parts = []
         
         # Previous text
-        prev = img_tag.find_previous_sibling(['p', 'div', 'span', 'h1', 'h2', 'li'])
+        prev = img_tag.find_previous_sibling(list(CONTEXT_TAGS))
         if prev: context_parts.append(prev.get_text(strip=True)[:200])
         
         # Next text
-        nxt = img_tag.find_next_sibling(['p', 'div', 'span', 'h1', 'h2', 'li'])
+        nxt = img_tag.find_next_sibling(list(CONTEXT_TAGS))
         if nxt: context_parts.append(nxt.get_text(strip=True)[:200])
         
         # Parent container
-        parent = img_tag.find_parent(['figure', 'figcaption', 'div'])
+        parent = img_tag.find_parent(list(PARENT_TAGS))
         if parent and parent != img_tag.parent:
             caption = parent.get_text(strip=True)[:200]
             if caption: context_parts.append(caption)
@@ -70,4 +91,68 @@ class HtmlProcessor:
         # Alt/Title
         if img_tag.get('alt'): context_parts.append(img_tag['alt'])
         
-        return " ".join(context_parts)[:500]
\ No newline at end of file
+        return " ".join(context_parts)[:500]
+
+class LxmlHtmlProcessor(HtmlProcessor):
+    """
+    Same output schema as HtmlProcessor, on libxml2 instead of pure-Python html.parser.
+    One walk over the <img> elements; context lookups use lxml's C-level
+    sibling/ancestor iterators, and markers are spliced into the text/tail
+    slots in document order (so later contexts see earlier markers, as with bs4).
+    """
+    def process(self, html_content, page_id, page_title):
+        if not html_content.strip(): return html_content
+        root = lxml.html.fragment_fromstring(html_content, create_parent='div')
+        
+        for i, img in enumerate(list(root.iter('img'))):
+            src = img.get('src')
+            if not src: continue
+            
+            chunk_id = self._image_id(page_id, src)
+            context = self._get_image_context(img, root)
+            self.images.append(self._image_chunk(chunk_id, src, i, page_id, context))
+            self._replace_with_text(img, f" [[IMG:{chunk_id}]] ")
+        
+        return (root.text or "") + "".join(lxml.html.tostring(child, encoding="unicode") for child in root)
+
+    def _get_image_context(self, img, root) -> str:
+        context_parts = []
+        
+        # Previous / next text
+        for sibling in (self._first_match(img.itersiblings(preceding=True), CONTEXT_TAGS),
+                        self._first_match(img.itersiblings(), CONTEXT_TAGS)):
+            if sibling is not None: context_parts.append(self._text(sibling)[:200])
+        
+        # Parent container (our synthetic wrapper doesn't count)
+        parent = self._first_match(img.iterancestors(), PARENT_TAGS)
+        if parent is not None and parent is not root and parent is not img.getparent():
+            caption = self._text(parent)[:200]
+            if caption: context_parts.append(caption)
+        
+        # Alt/Title
+        if img.get('alt'): context_parts.append(img.get('alt'))
+        
+        return " ".join(context_parts)[:500]
+
+    @staticmethod
+    def _first_match(elements, tags):
+        for el in elements:
+            if isinstance(el.tag, str) and el.tag in tags:
+                return el
+        return None
+
+    @staticmethod
+    def _text(el):
+        """Equivalent of bs4 get_text(strip=True)."""
+        return "".join(t.strip() for t in el.itertext())
+
+    @staticmethod
+    def _replace_with_text(el, text):
+        parent = el.getparent()
+        prev = el.getprevious()
+        text += el.tail or ""
+        if prev is not None:
+            prev.tail = (prev.tail or "") + text
+        else:
+            parent.text = (parent.text or "") + text
+        parent.remove(el)
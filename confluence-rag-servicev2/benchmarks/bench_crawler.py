@@ -0,0 +1,44 @@
+"""
+Crawler benchmark against the in-process fake Confluence.
+
+Usage (from confluence-rag-servicev2/):
+    OUTPUT_DIR=/tmp/confluence-bench python -m benchmarks.bench_crawler --pages 500 --concurrency 8 --rate-limit 40
+    OUTPUT_DIR=/tmp/confluence-bench python -m benchmarks.bench_crawler --pages 500 --mode tree
+"""
+import time
+import asyncio
+import argparse
+import httpx
+from benchmarks.fake_confluence import create_app, PAGE_ID_BASE
+from app.services.confluence import AsyncConfluenceClient
+from app.services.crawler import ConfluenceCrawler
+from app.services.rate_limiter import AdaptiveRateLimiter
+
+async def crawl(args):
+    fake_app = create_app(num_pages=args.pages, fanout=args.fanout, latency=args.latency, rate_limit_rps=args.rate_limit)
+    transport = httpx.ASGITransport(app=fake_app)
+    limiter = AdaptiveRateLimiter(rate=args.start_rps, max_rate=args.max_rps)
+    start = time.perf_counter()
+    pages = 0
+    async with AsyncConfluenceClient("http://fake/wiki", "user", "token", limiter=limiter, transport=transport) as client:
+        async for _data, _depth, _parent in ConfluenceCrawler(client, args.concurrency).crawl(str(PAGE_ID_BASE), mode=args.mode):
+            pages += 1
+    elapsed = time.perf_counter() - start
+    fake = fake_app.state.fake
+    print(f"mode: {args.mode}  pages: {pages}  time: {elapsed:.2f}s  pages/s: {pages / elapsed:.1f}")
+    print(f"requests: {fake.requests}  throttled (429): {fake.throttled}  final rate: {limiter.rate:.2f}/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["bulk", "tree"], default="bulk")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Server-side requests/sec before 429")
+    parser.add_argument("--start-rps", type=float, default=10.0)
+    parser.add_argument("--max-rps", type=float, default=50.0)
+    asyncio.run(crawl(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+HTML preprocessing benchmark on large synthetic storage-format pages.
+
+Compares the bs4 (html.parser) and lxml engines and checks they agree on
+image IDs, surrounding context and the image markers left in the HTML.
+
+Usage (from confluence-rag-servicev2/):
+    OUTPUT_DIR=/tmp/confluence-bench python -m benchmarks.bench_html_parser --sections 500 --images-per-section 4
+"""
+import re
+import time
+import argparse
+from app.utils.html_parser import HtmlProcessor, LxmlHtmlProcessor
+
+def storage_page(sections, images_per_section):
+    """Roughly what a long runbook/design page looks like in storage format."""
+    parts = []
+    for s in range(sections):
+        parts.append(f"<h2>Section {s}</h2>")
+        parts.append(f"<p>Intro to section {s} with <strong>bold</strong> and <a href=\"/wiki/x\">links</a>.</p>")
+        parts.append('<ac:structured-macro ac:name="info"><ac:rich-text-body><p>Note macro body.</p></ac:rich-text-body></ac:structured-macro>')
+        for i in range(images_per_section):
+            parts.append(
+                f"<div class=\"figure\"><p>Before figure {s}.{i}</p>"
+                f"<img src=\"/wiki/download/attachments/1/fig-{s}-{i}.png\" alt=\"Figure {s}.{i}\"/>"
+                f"<span>Caption for figure {s}.{i}</span></div>"
+            )
+        parts.append("<table><tbody>" + "".join(f"<tr><td>r{r}c1</td><td>r{r}c2</td></tr>" for r in range(5)) + "</tbody></table>")
+        parts.append("<ul>" + "".join(f"<li>Item {n}</li>" for n in range(5)) + "</ul>")
+    return "".join(parts)
+
+def bench(cls, html, runs):
+    best, processor, output = float("inf"), None, None
+    for _ in range(runs):
+        processor = cls("https://example.atlassian.net/wiki")
+        start = time.perf_counter()
+        output = processor.process(html, "1", "Bench")
+        best = min(best, time.perf_counter() - start)
+    return best, processor, output
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--images-per-section", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    html = storage_page(args.sections, args.images_per_section)
+    print(f"page size: {len(html) / 1024:.0f} KiB, images: {args.sections * args.images_per_section}")
+
+    bs4_time, bs4_proc, bs4_out = bench(HtmlProcessor, html, args.runs)
+    lxml_time, lxml_proc, lxml_out = bench(LxmlHtmlProcessor, html, args.runs)
+    print(f"bs4 (html.parser): {bs4_time * 1000:8.1f} ms")
+    print(f"lxml:              {lxml_time * 1000:8.1f} ms  ({bs4_time / lxml_time:.1f}x)")
+
+    # Image IDs are deterministic, so chunk IDs and the [[IMG:...]] markers left in the HTML must match too
+    key = lambda imgs: [(i["chunk_id"], i["context_text"]) for i in imgs]
+    markers = lambda out: re.findall(r"\[\[IMG:[^\]]+\]\]", out)
+    same = key(bs4_proc.images) == key(lxml_proc.images) and markers(bs4_out) == markers(lxml_out)
+    print(f"outputs agree:     {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Local fake Confluence for exercising the crawler without a real instance.
+
+Serves a synthetic page tree from the content REST API (per-page children
+and paginated CQL ancestor search) with configurable latency and a server-side rate limit that answers 429 + Retry-After.
+
+Run standalone:
+    uvicorn benchmarks.fake_confluence:app --port 8090
+or in-process via httpx.ASGITransport(app=create_app(...)).
+"""
+import time
+import asyncio
+import re
+import hashlib
+from urllib.parse import urlencode
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+PAGE_ID_BASE = 1000
+
+class FakeConfluence:
+    def __init__(self, num_pages=200, fanout=5, latency=0.05, rate_limit_rps=None, retry_after=1):
+        self.num_pages = num_pages
+        self.fanout = fanout
+        self.latency = latency
+        self.rate_limit_rps = rate_limit_rps
+        self.retry_after = retry_after
+        self.tokens = float(rate_limit_rps or 0)
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.versions = {}  # index -> version number; bump to simulate an edit
+        self.downloads = 0
+        self.not_modified = 0
+
+    # Tree shape: page i has children i*fanout+1 .. i*fanout+fanout
+    def page_id(self, index):
+        return str(PAGE_ID_BASE + index)
+
+    def index_of(self, page_id):
+        index = int(page_id) - PAGE_ID_BASE
+        if not 0 <= index < self.num_pages:
+            raise HTTPException(404, detail="Page not found")
+        return index
+
+    def children_of(self, index):
+        first = index * self.fanout + 1
+        return [i for i in range(first, first + self.fanout) if i < self.num_pages]
+
+    def parent_of(self, index):
+        return None if index == 0 else (index - 1) // self.fanout
+
+    def ancestors_of(self, index):
+        chain, parent = [], self.parent_of(index)
+        while parent is not None:
+            chain.insert(0, {"id": self.page_id(parent), "title": f"Page {parent}"})
+            parent = self.parent_of(parent)
+        return chain
+
+    def descendants_of(self, index):
+        found, frontier = [], self.children_of(index)
+        while frontier:
+            found.extend(frontier)
+            frontier = [c for i in frontier for c in self.children_of(i)]
+        return found
+
+    def body(self, index):
+        version = self.versions.get(index, 1)
+        paragraphs = "".join(f"<p>Paragraph {n} of page {index} (v{version}).</p>" for n in range(5))
+        # Every page also embeds one shared attachment, like a logo
+        return (f"<h1>Page {index}</h1>{paragraphs}"
+                f"<p><img src=\"/wiki/download/attachments/{index}/diagram.png\" alt=\"Diagram {index}\"/></p>"
+                f"<p><img src=\"/wiki/download/attachments/0/logo.png\" alt=\"Logo\"/></p>")
+
+    def page(self, index):
+        return {
+            "id": self.page_id(index),
+            "type": "page",
+            "title": f"Page {index}",
+            "space": {"key": "FAKE"},
+            "version": {"number": self.versions.get(index, 1), "when": "2024-01-01T00:00:00.000Z"},
+            "body": {"storage": {"value": self.body(index), "representation": "storage"}},
+        }
+
+    def allow(self):
+        """Server-side token bucket; False means answer 429."""
+        if not self.rate_limit_rps:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit_rps, self.tokens + (now - self.updated) * self.rate_limit_rps)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+def create_app(**kwargs):
+    fake = FakeConfluence(**kwargs)
+    app = FastAPI(title="Fake Confluence")
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def simulate_server(request, call_next):
+        fake.requests += 1
+        if not fake.allow():
+            fake.throttled += 1
+            return JSONResponse({"message": "Rate limited"}, status_code=429, headers={"Retry-After": str(fake.retry_after)})
+        await asyncio.sleep(fake.latency)
+        return await call_next(request)
+
+    # Registered before /content/{page_id} so "search" isn't taken for a page ID
+    @app.get("/wiki/rest/api/content/search")
+    async def search(request: Request, cql: str, expand: str = "", limit: int = 25, start: int = 0):
+        match = re.search(r"ancestor\s*=\s*(\d+)", cql)
+        if not match:
+            raise HTTPException(400, detail="Only ancestor= CQL is supported")
+        matches = fake.descendants_of(fake.index_of(match.group(1)))
+        results = []
+        for i in matches[start:start + limit]:
+            page = fake.page(i)
+            if "ancestors" in expand:
+                page["ancestors"] = fake.ancestors_of(i)
+            results.append(page)
+        links = {"base": f"{str(request.base_url).rstrip('/')}/wiki"}
+        if start + limit < len(matches):
+            links["next"] = "/rest/api/content/search?" + urlencode({"cql": cql, "expand": expand, "limit": limit, "start": start + limit})
+        return {"results": results, "start": start, "limit": limit, "size": len(results), "_links": links}
+
+    @app.get("/wiki/rest/api/content/{page_id}")
+    async def get_content(page_id: str, expand: str = ""):
+        index = fake.index_of(page_id)
+        data = fake.page(index)
+        if "ancestors" in expand:
+            data["ancestors"] = fake.ancestors_of(index)
+        if "children.page" in expand:
+            data["children"] = {"page": {"results": [
+                {"id": fake.page_id(c), "title": f"Page {c}"} for c in fake.children_of(index)
+            ]}}
+        return data
+
+    @app.get("/wiki/download/attachments/{index}/{name}")
+    async def download(index: int, name: str, request: Request):
+        content = f"PNG-{index}-{name}".encode() * 256
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            fake.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        fake.downloads += 1
+        return Response(content, media_type="image/png", headers={"ETag": etag})
+
+    return app
+
+app = create_app()
@@ -30,6 +30,7 @@ export const processDocument = async (pdfPath, category, subcategory = '') => {
     pdf_path_or_url: pdfPath,
     category,
     subcategory,
+    priority: 'interactive',
   });
   return response.data;
 };